@@ -1,4 +1,5 @@
 from fmframework.io.csv import export_scrobbles
+from fmframework.io.sync import ScrobbleSync, ScrobbleStore
 from fmframework.net.network import Network, LastFMNetworkException
 
 import sys
@@ -18,14 +19,22 @@ logger.addHandler(stream_handler)
 
 def backup_scrobbles(file_path):
     net = Network(username='sarsoo', api_key=os.environ['FMKEY'])
+    store = ScrobbleStore()
 
     try:
-        scrobbles = net.recent_tracks()
+        ScrobbleSync(net=net, store=store).sync()
+
+        stored = store.count(net.username)
+        total = net.count_recent_tracks()
+        if stored != total:
+            logger.warning(f'{stored} scrobbles stored, last.fm reports {total}')
+        else:
+            logger.info(f'{stored} scrobbles stored, matches last.fm')
 
         if not os.path.exists(file_path):
             os.makedirs(file_path)
 
-        export_scrobbles(scrobbles, file_path)
+        export_scrobbles(store.scrobbles(net.username), file_path)
 
     except LastFMNetworkException:
         logger.exception('error during scrobble retrieval')
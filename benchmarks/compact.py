@@ -0,0 +1,58 @@
+"""Compare retained memory of full and compact models for a synthetic recent tracks history
+
+    python -m benchmarks.compact [scrobbles] [tracks]
+"""
+import json
+import random
+import sys
+import tracemalloc
+
+from fmframework.model.compact import ScrobbleInterner
+from fmframework.net.network import BaseNetwork
+
+
+def pages(scrobbles: int, tracks: int):
+    """Raw recent track dicts drawn from a library of tracks by tracks // 10 albums and tracks // 50 artists"""
+    rng = random.Random(9)
+    library = []
+    for i in range(tracks):
+        artist = i % max(tracks // 50, 1)
+        album = i % max(tracks // 10, 1)
+        library.append({
+            'name': f'Track {i}',
+            'mbid': f'{i:08x}-0000-0000-0000-000000000000',
+            'url': f'https://www.last.fm/music/Artist+{artist}/_/Track+{i}',
+            'artist': {'#text': f'Artist {artist}', 'mbid': f'{artist:08x}-1111-1111-1111-111111111111'},
+            'album': {'#text': f'Album {album}', 'mbid': f'{album:08x}-2222-2222-2222-222222222222'},
+        })
+
+    start = 1_600_000_000
+    history = [dict(rng.choice(library), date={'uts': str(start + i * 180)}) for i in range(scrobbles)]
+    # round trip so every scrobble holds its own strings like a decoded response
+    return json.loads(json.dumps(history))
+
+
+def retained(parse, raw) -> int:
+    """Bytes allocated for the parsed models, strings taken from raw are already allocated and not counted"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = [parse(i) for i in raw]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del parsed
+    return size
+
+
+def run(scrobbles: int = 100000, tracks: int = 5000):
+    raw = pages(scrobbles, tracks)
+    print(f'{scrobbles} scrobbles over {tracks} tracks')
+
+    full = retained(BaseNetwork.parse_scrobble, raw)
+    compact = retained(ScrobbleInterner().parse_scrobble, raw)
+
+    print(f'{"full":<8} {full / 2 ** 20:8.1f} MiB')
+    print(f'{"compact":<8} {compact / 2 ** 20:8.1f} MiB  {full / compact:.1f}x smaller')
+
+
+if __name__ == '__main__':
+    run(*[int(i) for i in sys.argv[1:3]])
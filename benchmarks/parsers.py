@@ -0,0 +1,72 @@
+"""Time each installed HTML parser backend against the stored library page fixtures
+
+    python -m benchmarks.parsers [repeats]
+"""
+import os
+import sys
+from timeit import timeit
+
+from fmframework.net.html import get_backend
+from fmframework.net.scrape import LibraryScraper, UserScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+BACKENDS = ['html.parser', 'bs4/lxml', 'lxml', 'selectolax']
+
+# fixture name -> row to model conversion used by the scraper for that page
+PAGES = {
+    'artist_tracks.html': lambda row: LibraryScraper.row_to_track(row, artist='Radiohead'),
+    'track_scrobbles.html': lambda row: LibraryScraper.row_to_scrobble(row, artist='Radiohead'),
+    'album_chart.html': UserScraper.row_to_album,
+}
+
+
+def load_backends():
+    backends = []
+    for name in BACKENDS:
+        try:
+            backend = get_backend(name)
+            backend.parse(b'<html></html>')
+        except Exception as e:  # missing module or bs4 tree builder
+            print(f'{name:<12} unavailable ({e.__class__.__name__}: {e})')
+            continue
+        backends.append(backend)
+    return backends
+
+
+def models(backend, content, convert):
+    rows, pages = backend.parse(content)
+    return [convert(row) for row in rows], pages
+
+
+def run(repeats: int = 50):
+    backends = load_backends()
+    if not backends:
+        return
+
+    for fixture, convert in PAGES.items():
+        with open(os.path.join(FIXTURES, fixture), 'rb') as f:
+            content = f.read()
+
+        print(f'\n{fixture} ({len(content) / 1024:.0f} KiB, {repeats} repeats)')
+
+        baseline_time = None
+        baseline_models = None
+        for backend in backends:
+            result = models(backend, content, convert)
+            elapsed = timeit(lambda: models(backend, content, convert), number=repeats) / repeats
+
+            if baseline_time is None:
+                baseline_time, baseline_models = elapsed, result
+
+            # scrobble times relative to today are equal across backends within a run
+            matches = [str(i) for i in result[0]] == [str(i) for i in baseline_models[0]] \
+                and [getattr(i, 'user_scrobbles', None) for i in result[0]] \
+                == [getattr(i, 'user_scrobbles', None) for i in baseline_models[0]] \
+                and result[1] == baseline_models[1]
+
+            print(f'{backend.name:<12} {elapsed * 1000:8.2f} ms  {len(result[0]):>3} rows  '
+                  f'{baseline_time / elapsed:5.1f}x  {"ok" if matches else "MISMATCH"}')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,131 @@
+"""Offline scraper benchmark replaying recorded pages through LibraryScraper and UserScraper
+
+    python -m benchmarks.scrape [--fixtures DIR] [--parser NAME] [--repeats N]
+    python -m benchmarks.scrape --record DIR USERNAME ARTIST [TRACK]
+
+Reports mean time per stage (fetch, parse, model construction) and end to end through the scraper, rows per
+second and tracemalloc allocations for one end to end run. Recording captures live pages into a fixture
+directory which can then be replayed with --fixtures
+"""
+import argparse
+import os
+import tracemalloc
+from datetime import date
+from time import perf_counter
+
+from fmframework.net.html import get_backend
+from fmframework.net.scrape import LibraryScraper, ScrapeExecutor, UserScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+USERNAME = 'sarsoo'
+
+# name -> (scraper call, recorded url, row to model conversion)
+SCENARIOS = {
+    'artist tracks': (
+        lambda: LibraryScraper.scraped_artist_subpage(USERNAME, 'Radiohead', page=1, url_key='tracks'),
+        f'https://www.last.fm/user/{USERNAME}/library/music/Radiohead/+tracks?page=1',
+        lambda row: LibraryScraper.row_to_track(row, artist='Radiohead'),
+    ),
+    'track scrobbles': (
+        lambda: LibraryScraper.scraped_artist_subpage(USERNAME, 'Radiohead', page=1, track='Karma Police'),
+        f'https://www.last.fm/user/{USERNAME}/library/music/Radiohead/_/Karma+Police?page=1',
+        lambda row: LibraryScraper.row_to_scrobble(row, artist='Radiohead'),
+    ),
+    'album chart': (
+        lambda: UserScraper.scraped_album_chart_page(USERNAME, date(2020, 1, 1), date(2020, 12, 31), page=1),
+        f'https://www.last.fm/user/{USERNAME}/library/albums?from=2020-01-01&to=2020-12-31&page=1',
+        UserScraper.row_to_album,
+    ),
+}
+
+
+def mean_time(fn, repeats: int) -> float:
+    start = perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (perf_counter() - start) / repeats
+
+
+def allocations(fn):
+    """Peak traced bytes and number of blocks still allocated after one call"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(i.count for i in snapshot.statistics('filename'))
+    return result, peak, blocks
+
+
+def run(fixtures: str, parser: str, repeats: int):
+    executor = ScrapeExecutor.replaying(fixtures, max_workers=1, job_workers=1)
+    backend = get_backend(parser)
+
+    previous = LibraryScraper.executor, LibraryScraper.parser, UserScraper.executor, UserScraper.parser
+    LibraryScraper.executor = UserScraper.executor = executor
+    LibraryScraper.parser = UserScraper.parser = backend
+
+    print(f'parser {backend.name}, {repeats} repeats, fixtures {fixtures}\n')
+    print(f'{"scenario":<16} {"fetch ms":>9} {"parse ms":>9} {"model ms":>9} {"total ms":>9} '
+          f'{"rows":>5} {"rows/s":>9} {"peak KiB":>9} {"blocks":>7}')
+
+    try:
+        for name, (scrape, url, convert) in SCENARIOS.items():
+            if url not in executor.fixtures:
+                print(f'{name:<16} no fixture for {url}')
+                continue
+
+            content = executor.get(url).content
+            rows, _ = backend.parse(content)
+
+            fetch = mean_time(lambda: executor.get(url), repeats)
+            parse = mean_time(lambda: backend.parse(content), repeats)
+            model = mean_time(lambda: [convert(row) for row in rows], repeats)
+            total = mean_time(scrape, repeats)
+
+            result, peak, blocks = allocations(scrape)
+            if isinstance(result, tuple):
+                result = result[0]
+            count = len(result) if result is not None else 0
+
+            print(f'{name:<16} {fetch * 1000:9.3f} {parse * 1000:9.3f} {model * 1000:9.3f} {total * 1000:9.3f} '
+                  f'{count:>5} {count / total if total else 0:9.0f} {peak / 1024:9.1f} {blocks:>7}')
+    finally:
+        LibraryScraper.executor, LibraryScraper.parser, UserScraper.executor, UserScraper.parser = previous
+
+
+def record(fixtures: str, username: str, artist: str, track: str = None):
+    """Capture the live first pages of an artist's tracks, albums and optionally one track's scrobbles"""
+    executor = ScrapeExecutor.recording(fixtures)
+    previous = LibraryScraper.executor
+    LibraryScraper.executor = executor
+
+    try:
+        for url_key in ('tracks', 'albums'):
+            LibraryScraper.scraped_artist_subpage(username, artist, page=1, url_key=url_key)
+        if track:
+            LibraryScraper.scraped_artist_subpage(username, artist, page=1, track=track)
+    finally:
+        LibraryScraper.executor = previous
+        executor.shutdown()
+
+    print(f'{len(executor.fixtures)} pages indexed in {fixtures}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES)
+    parser.add_argument('--parser', default='auto')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--record', nargs='+', metavar=('DIR', 'USERNAME'))
+    args = parser.parse_args()
+
+    if args.record:
+        if len(args.record) < 3:
+            parser.error('--record needs DIR USERNAME ARTIST [TRACK]')
+        record(*args.record[:4])
+    else:
+        run(args.fixtures, args.parser, args.repeats)
@@ -0,0 +1,74 @@
+"""Compare per tile resize and putText labelling with TileProcessor on synthetic covers
+
+    python -m benchmarks.tiles [tiles] [repeats]
+"""
+import sys
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from fmframework.image.downloader import Downloader
+from fmframework.image.tiles import TileProcessor
+
+FINAL_SCALE = (300, 300)
+
+
+def covers(count: int, size: int = 600):
+    rng = np.random.default_rng(18)
+    return [rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def old_path(images, counts):
+    tiles = []
+    for image, count in zip(images, counts):
+        tile = cv2.resize(image, FINAL_SCALE)
+        Downloader.add_scrobble_count_to_image(tile, count)
+        tiles.append(tile)
+    return tiles
+
+
+def new_path(images, counts, processes=1, process_threshold=64):
+    return TileProcessor(final_scale=FINAL_SCALE,
+                         processes=processes,
+                         process_threshold=process_threshold).process_many(images, counts)
+
+
+def timed(fn, repeats: int):
+    start = perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (perf_counter() - start) / repeats, result
+
+
+def run(tile_count: int = 100, repeats: int = 5):
+    images = covers(tile_count)
+    counts = [int(i) for i in np.random.default_rng(1).integers(1, 5000, tile_count)]
+
+    # labels only, tiles already at size, checks sprites reproduce putText to within rounding
+    sized = [cv2.resize(i, FINAL_SCALE) for i in images]
+    old_labels, old_labelled = timed(lambda: old_path([i.copy() for i in sized], counts), repeats)
+
+    processor = TileProcessor()
+    new_labels, new_labelled = timed(lambda: [processor.process(i.copy(), c) for i, c in zip(sized, counts)],
+                                     repeats)
+    difference = max(int(np.abs(i.astype(np.int16) - j.astype(np.int16)).max())
+                     for i, j in zip(old_labelled, new_labelled))
+
+    print(f'{tile_count} tiles {images[0].shape[1]}px -> {FINAL_SCALE[0]}px, {repeats} repeats\n')
+    print(f'{"labels putText":<28} {old_labels * 1000:9.2f} ms')
+    print(f'{"labels sprites":<28} {new_labels * 1000:9.2f} ms  {old_labels / new_labels:5.1f}x  '
+          f'max difference {difference}{"" if difference <= 1 else " DIFFERENT"}  (opencv {cv2.__version__})')
+
+    old, _ = timed(lambda: old_path([i.copy() for i in images], counts), repeats)
+    new, _ = timed(lambda: new_path([i.copy() for i in images], counts, processes=1), repeats)
+    pooled, _ = timed(lambda: new_path([i.copy() for i in images], counts, processes=None, process_threshold=1),
+                      repeats)
+
+    print(f'{"resize + putText":<28} {old * 1000:9.2f} ms')
+    print(f'{"TileProcessor":<28} {new * 1000:9.2f} ms  {old / new:5.1f}x')
+    print(f'{"TileProcessor process pool":<28} {pooled * 1000:9.2f} ms  {old / pooled:5.1f}x')
+
+
+if __name__ == '__main__':
+    run(*(int(i) for i in sys.argv[1:3]))
@@ -1,4 +1,6 @@
+from fmframework.analysis.duplicates import DuplicateDetector
 from fmframework.net.network import Network, LastFMNetworkException
+from fmframework.net.retry import RetryPolicy
 
 from urllib import parse
 from csv import DictWriter
@@ -23,49 +25,28 @@ stream_handler.setFormatter(logging.Formatter('%(levelname)s %(name)s:%(funcName
 logger.addHandler(stream_handler)
 
 
-# chunk scrobbles into successive groups of sample size
-def neighbouring_scrobbles(scrobbles, sample_size):
-
-    if len(scrobbles) < sample_size:
-        logger.warning(f'less scrobbles than provided sample size {len(scrobbles)}/{sample_size}')
-
-    start_idx = 0
-    final_idx = min(sample_size, len(scrobbles) - 1)
-
-    while start_idx < len(scrobbles):
-        yield scrobbles[start_idx:final_idx]
-        start_idx += 1
-        final_idx = min(final_idx + 1, len(scrobbles) - 1)
-
-
 def check_for_duplicates(fmkey, retrieval_limit):
-    net = Network(username=username, api_key=fmkey)
-    net.retry_counter = 20
+    net = Network(username=username, api_key=fmkey, retry_policy=RetryPolicy(max_retries=20))
 
     try:
-        scrobbles = net.recent_tracks(limit=retrieval_limit, page_limit=200)
+        detector = DuplicateDetector(scrobbles=6)
+        duplicates_found = list(detector.scan(net.iter_recent_tracks(limit=retrieval_limit, page_limit=200)))
 
-        if not scrobbles:
+        if detector.seen == 0:
             logger.error('No scrobbles returned')
             return
 
-        duplicates_found = []
-        for scrobble_group in neighbouring_scrobbles(scrobbles, 7):
-            for idx, to_check in enumerate(scrobble_group[1:]):
-                if scrobble_group[0].track == to_check.track:
-                    duplicates_found.append((scrobble_group[0], to_check, idx + 1))
-
         print(f'Found {len(duplicates_found)} duplicates')
         print()
 
         for duplicate in duplicates_found:
-            print(f'{duplicate[1].time} - {duplicate[0].time}, {duplicate[0].track}')
+            print(f'{duplicate.first.time} - {duplicate.second.time}, {duplicate.second.track}')
             print(f'https://www.last.fm/user/{username}/library/music/'
-                  f'{parse.quote_plus(duplicate[0].track.artist.name)}/_/'
-                  f'{parse.quote_plus(duplicate[0].track.name)}')
+                  f'{parse.quote_plus(duplicate.second.track.artist.name)}/_/'
+                  f'{parse.quote_plus(duplicate.second.track.name)}')
             print(f'https://www.last.fm/user/{username}/library'
-                  f'?from={duplicate[0].time.strftime("%Y-%m-%d")}'
-                  f'&to={duplicate[1].time.strftime("%Y-%m-%d")}')
+                  f'?from={duplicate.first.time.strftime("%Y-%m-%d")}'
+                  f'&to={duplicate.second.time.strftime("%Y-%m-%d")}')
             print()
 
         headers = ['initial', 'duplicate', 'scrobble difference', 'difference minutes', 'track',
@@ -77,19 +58,19 @@ def check_for_duplicates(fmkey, retrieval_limit):
 
             for duplicate in duplicates_found:
                 writer.writerow({
-                    'initial': duplicate[1].time,
-                    'duplicate': duplicate[0].time,
-                    'scrobble difference': duplicate[2],
-                    'difference minutes': (duplicate[0].time - duplicate[1].time).total_seconds() / 60,
-                    'track': duplicate[0].track.name,
-                    'album': duplicate[0].track.album.name,
-                    'artist': duplicate[0].track.artist.name,
+                    'initial': duplicate.first.time,
+                    'duplicate': duplicate.second.time,
+                    'scrobble difference': duplicate.scrobble_difference,
+                    'difference minutes': duplicate.time_difference.total_seconds() / 60,
+                    'track': duplicate.second.track.name,
+                    'album': duplicate.second.track.album.name,
+                    'artist': duplicate.second.track.artist.name,
                     'track url': f'https://www.last.fm/user/{username}/library/music/'
-                                 f'{parse.quote_plus(duplicate[0].track.artist.name)}/_/'
-                                 f'{parse.quote_plus(duplicate[0].track.name)}',
+                                 f'{parse.quote_plus(duplicate.second.track.artist.name)}/_/'
+                                 f'{parse.quote_plus(duplicate.second.track.name)}',
                     'scrobbles url': f'https://www.last.fm/user/{username}/library'
-                                     f'?from={duplicate[1].time.strftime("%Y-%m-%d")}'
-                                     f'&to={duplicate[0].time.strftime("%Y-%m-%d")}'
+                                     f'?from={duplicate.first.time.strftime("%Y-%m-%d")}'
+                                     f'&to={duplicate.second.time.strftime("%Y-%m-%d")}'
                 })
 
     except LastFMNetworkException:
@@ -0,0 +1,160 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from fmframework.io.columnar import ScrobbleTable
+from fmframework.model import Album, Artist, Scrobble, Track
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+
+class ScrobbleArrays:
+    """Integer coded NumPy view of a scrobble history for vectorised charts.
+
+    Holds time sorted timestamp, artist, album and track id arrays over the string tables of a ScrobbleTable.
+    Date ranges resolve with searchsorted and counts with bincount so charts over any range are computed
+    locally"""
+
+    def __init__(self, table: ScrobbleTable):
+        table.ensure_sorted()
+        self.table = table
+
+        self.times = self._array(table.times)
+        self.artist_ids = self._array(table.artist_ids)
+        self.album_ids = self._array(table.album_ids)
+        self.track_ids = self._array(table.track_ids)
+
+    @classmethod
+    def from_table(cls, table: ScrobbleTable):
+        return cls(table)
+
+    @classmethod
+    def from_scrobbles(cls, scrobbles: Iterable[Scrobble]):
+        return cls(ScrobbleTable.from_scrobbles(scrobbles))
+
+    def __len__(self):
+        return len(self.times)
+
+    @staticmethod
+    def _array(values) -> np.ndarray:
+        return np.frombuffer(values, dtype=f'i{values.itemsize}').astype(np.int64)
+
+    def bounds(self, from_time: datetime = None, to_time: datetime = None) -> Tuple[int, int]:
+        """Row range of scrobbles in [from_time, to_time)"""
+        lower = int(np.searchsorted(self.times, int(from_time.timestamp()))) if from_time is not None else 0
+        upper = int(np.searchsorted(self.times, int(to_time.timestamp()))) if to_time is not None else len(self)
+        return lower, max(lower, upper)
+
+    def top(self, ids: np.ndarray, limit: int = 10,
+            from_time: datetime = None, to_time: datetime = None) -> List[Tuple[int, int]]:
+        """(id, count) of the limit most played ids over a time range"""
+        lower, upper = self.bounds(from_time, to_time)
+        window = ids[lower:upper]
+        window = window[window != ScrobbleTable.NONE]
+        if len(window) == 0:
+            return []
+
+        counts = np.bincount(window)
+        charted = int(np.count_nonzero(counts))
+        limit = min(limit, charted) if limit is not None else charted
+        if limit <= 0:
+            return []
+
+        if limit < len(counts):
+            # keep every id tied with the last place so the cut below is decided by id, not partition order
+            boundary = counts[np.argpartition(-counts, limit - 1)[limit - 1]]
+            candidates = np.flatnonzero(counts >= boundary)
+        else:
+            candidates = np.arange(len(counts))
+
+        # most played first, ties by id for a stable order
+        order = candidates[np.lexsort((candidates, -counts[candidates]))]
+        return [(int(i), int(counts[i])) for i in order[:limit]]
+
+    def top_artists(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Artist]:
+        return [Artist(name=self.table.artists[i], mbid=self.table.artist_mbids[i], user_scrobbles=count)
+                for i, count in self.top(self.artist_ids, limit, from_time, to_time)]
+
+    def top_albums(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Album]:
+        albums = []
+        for i, count in self.top(self.album_ids, limit, from_time, to_time):
+            name, artist_id = self.table.albums[i]
+            albums.append(Album(name=name, mbid=self.table.album_mbids[i], artist=self.table.artist(artist_id),
+                                user_scrobbles=count))
+        return albums
+
+    def top_tracks(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Track]:
+        tracks = []
+        for i, count in self.top(self.track_ids, limit, from_time, to_time):
+            name, artist_id = self.table.tracks[i]
+            tracks.append(Track(name=name, mbid=self.table.track_mbids[i], artist=self.table.artist(artist_id),
+                                user_scrobbles=count))
+        return tracks
+
+    def album_chart(self, from_date: date, to_date: date, limit: int) -> List[Album]:
+        """Top albums from from_date to to_date inclusive, the local equivalent of UserScraper.album_chart"""
+        return self.top_albums(limit=limit,
+                               from_time=datetime.combine(from_date, time()),
+                               to_time=datetime.combine(to_date + timedelta(days=1), time()))
+
+    def period_counts(self,
+                      period: str = 'day',
+                      from_date: date = None,
+                      to_date: date = None) -> Tuple[List[date], np.ndarray]:
+        """Scrobbles in each local day, week (from Monday), month or year from from_date to to_date inclusive,
+        returns period start dates and counts"""
+        if period not in PERIODS:
+            raise ValueError(f'period {period} not one of {PERIODS}')
+        if len(self) == 0:
+            return [], np.zeros(0, dtype=np.int64)
+
+        if from_date is None:
+            from_date = datetime.fromtimestamp(self.times[0]).date()
+        if to_date is None:
+            to_date = datetime.fromtimestamp(self.times[-1]).date()
+
+        starts = []
+        start = self._period_start(from_date, period)
+        while start <= to_date:
+            starts.append(start)
+            start = self._next_period(start, period)
+
+        # edges are local midnights so daylight saving changes fall on the right day
+        edges = np.array([int(datetime.combine(i, time()).timestamp()) for i in starts + [start]], dtype=np.int64)
+        positions = np.searchsorted(self.times, edges)
+        return starts, np.diff(positions)
+
+    def rolling(self,
+                window: int = 7,
+                period: str = 'day',
+                from_date: date = None,
+                to_date: date = None) -> Tuple[List[date], np.ndarray]:
+        """Sum of scrobbles over the trailing window periods ending at each period"""
+        starts, counts = self.period_counts(period=period, from_date=from_date, to_date=to_date)
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        lagged = cumulative[np.maximum(np.arange(1, len(cumulative)) - window, 0)]
+        return starts, cumulative[1:] - lagged
+
+    @staticmethod
+    def _period_start(day: date, period: str) -> date:
+        if period == 'week':
+            return day - timedelta(days=day.weekday())
+        if period == 'month':
+            return day.replace(day=1)
+        if period == 'year':
+            return day.replace(month=1, day=1)
+        return day
+
+    @staticmethod
+    def _next_period(start: date, period: str) -> date:
+        if period == 'week':
+            return start + timedelta(days=7)
+        if period == 'month':
+            return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+        if period == 'year':
+            return start.replace(year=start.year + 1)
+        return start + timedelta(days=1)
@@ -0,0 +1,89 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Deque, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+from fmframework.model import Scrobble, identity
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Duplicate:
+    """Two scrobbles of the same track close together, first is the earlier by time"""
+    first: Scrobble
+    second: Scrobble
+    scrobble_difference: int
+    time_difference: timedelta
+
+
+class DuplicateDetector:
+    """Single pass duplicate scrobble finder over a window of recent scrobbles.
+
+    Each scrobble is compared against the window of those before it in the stream, at most scrobbles positions
+    back and/or within a time span. Window entries are indexed by track identity so a check is one dict lookup
+    rather than a scan of the window. Works with either time ordering"""
+
+    def __init__(self, scrobbles: int = 6, within: timedelta = None):
+        if scrobbles is None and within is None:
+            raise ValueError('a scrobble count or time window is required')
+
+        self.scrobbles = scrobbles
+        self.within = within
+        self.seen = 0
+
+        self._window: Deque[Tuple[int, Scrobble, Hashable]] = deque()
+        self._index: Dict[Hashable, Deque[Tuple[int, Scrobble]]] = {}
+
+    def feed(self, scrobble: Scrobble) -> List[Duplicate]:
+        """Add the next scrobble in the stream, returns its duplicates among the window"""
+        position = self.seen
+        self.seen += 1
+        self._evict(position, scrobble)
+
+        key = identity(scrobble.track)
+        matches = self._index.get(key)
+
+        duplicates = []
+        if matches:
+            for match_position, match in matches:
+                first, second = (match, scrobble) if match.time <= scrobble.time else (scrobble, match)
+                duplicates.append(Duplicate(first=first,
+                                            second=second,
+                                            scrobble_difference=position - match_position,
+                                            time_difference=second.time - first.time))
+        else:
+            matches = self._index[key] = deque()
+
+        matches.append((position, scrobble))
+        self._window.append((position, scrobble, key))
+        return duplicates
+
+    def scan(self, scrobbles: Iterable[Scrobble]) -> Iterator[Duplicate]:
+        for scrobble in scrobbles:
+            yield from self.feed(scrobble)
+
+        logger.debug(f'scanned {self.seen} scrobbles')
+
+    def _evict(self, position: int, scrobble: Scrobble):
+        while self._window:
+            oldest_position, oldest, key = self._window[0]
+
+            in_count = self.scrobbles is None or position - oldest_position <= self.scrobbles
+            in_time = self.within is None or abs(scrobble.time - oldest.time) <= self.within
+            if in_count and in_time:
+                break
+
+            self._window.popleft()
+            matches = self._index[key]
+            matches.popleft()
+            if not matches:
+                del self._index[key]
+
+
+def find_duplicates(scrobbles: Iterable[Scrobble],
+                    window: int = 6,
+                    within: timedelta = None) -> Iterator[Duplicate]:
+    """Stream duplicates from scrobbles, see DuplicateDetector"""
+    return DuplicateDetector(scrobbles=window, within=within).scan(scrobbles)
@@ -0,0 +1,82 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from fmframework.model import Scrobble
+from fmframework.net.network import Network
+
+logger = logging.getLogger(__name__)
+
+
+class ScrobbleHistogram:
+    """Scrobble counts binned by local day, hour, hour of day and weekday.
+
+    Bin edges are local wall clock boundaries built in Python, so days and hours either side of a daylight
+    saving change land in the right bucket, timestamps are then binned with one searchsorted over the edges"""
+
+    def __init__(self, timestamps: Iterable[int]):
+        self.times = np.sort(np.fromiter(timestamps, dtype=np.int64))
+
+    @classmethod
+    def from_scrobbles(cls, scrobbles: Iterable[Scrobble]):
+        return cls(int(i.time.timestamp()) for i in scrobbles)
+
+    @classmethod
+    def from_network(cls,
+                     net: Network,
+                     username: str = None,
+                     from_time: datetime = None,
+                     to_time: datetime = None,
+                     page_limit: int = 200,
+                     concurrency: int = 1):
+        """Histogram of a time range fetched once, timestamps are read from the raw pages as they stream in"""
+        return cls(net.iter_recent_timestamps(username=username,
+                                              from_time=from_time,
+                                              to_time=to_time,
+                                              page_limit=page_limit,
+                                              concurrency=concurrency))
+
+    def __len__(self):
+        return len(self.times)
+
+    def daily(self, from_date: date = None, to_date: date = None) -> Tuple[List[date], np.ndarray]:
+        """Counts for each local day from from_date to to_date inclusive"""
+        from_date, to_date = self._date_range(from_date, to_date)
+        days = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+
+        return days, self._counts([datetime.combine(i, time()) for i in days]
+                                  + [datetime.combine(to_date + timedelta(days=1), time())])
+
+    def hourly(self, from_date: date = None, to_date: date = None) -> Tuple[List[datetime], np.ndarray]:
+        """Counts for each local hour of each day from from_date to to_date inclusive"""
+        from_date, to_date = self._date_range(from_date, to_date)
+        hours = [datetime.combine(from_date + timedelta(days=day), time(hour=hour))
+                 for day in range((to_date - from_date).days + 1)
+                 for hour in range(24)]
+
+        return hours, self._counts(hours + [datetime.combine(to_date + timedelta(days=1), time())])
+
+    def hour_of_day(self, from_date: date = None, to_date: date = None) -> np.ndarray:
+        """Counts for each of the 24 local hours of the day"""
+        hours, counts = self.hourly(from_date, to_date)
+        return np.bincount(np.array([i.hour for i in hours], dtype=np.int64), weights=counts,
+                           minlength=24).astype(np.int64)
+
+    def weekday(self, from_date: date = None, to_date: date = None) -> np.ndarray:
+        """Counts for each weekday, Monday first"""
+        days, counts = self.daily(from_date, to_date)
+        return np.bincount(np.array([i.weekday() for i in days], dtype=np.int64), weights=counts,
+                           minlength=7).astype(np.int64)
+
+    def _counts(self, edges: List[datetime]) -> np.ndarray:
+        positions = np.searchsorted(self.times, np.array([int(i.timestamp()) for i in edges], dtype=np.int64))
+        return np.diff(positions)
+
+    def _date_range(self, from_date: date = None, to_date: date = None) -> Tuple[date, date]:
+        if from_date is None:
+            from_date = datetime.fromtimestamp(self.times[0]).date() if len(self) else date.today()
+        if to_date is None:
+            to_date = datetime.fromtimestamp(self.times[-1]).date() if len(self) else date.today()
+        return from_date, to_date
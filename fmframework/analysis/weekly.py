@@ -0,0 +1,217 @@
+import logging
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import time
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional
+
+from fmframework.io.columnar import StringTable
+from fmframework.model import WeeklyChart
+from fmframework.net.cache import ResponseCache
+from fmframework.net.network import Network
+
+logger = logging.getLogger(__name__)
+
+OBJECT_TYPES = ('album', 'artist', 'track')
+
+# closed weeks never change so their charts are kept for good
+WEEKLY_TTLS = {f'user.getweekly{i}chart': None for i in OBJECT_TYPES}
+
+
+class WeeklyChartMatrix:
+    """Sparse week by entity play count matrix.
+
+    Entities are artist names or (name, artist name) for albums and tracks, interned to column ids. Non zero
+    cells are held as coordinate arrays of week index, entity id and play count. Series and ranks read from
+    a per entity index and per week sorted counts, built on first use and dropped when cells are added"""
+
+    def __init__(self, object_type: str, weeks: List[WeeklyChart]):
+        self.object_type = object_type
+        self.weeks = weeks
+        self.entities = StringTable()
+
+        self.week_ids = array('l')
+        self.entity_ids = array('l')
+        self.counts = array('l')
+
+        self._entity_offsets = None
+        self._entity_cells = None
+        self._week_counts = None
+
+    @property
+    def shape(self):
+        return len(self.weeks), len(self.entities)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, week: int, entity: Hashable, count: int):
+        self.week_ids.append(week)
+        self.entity_ids.append(self.entities.intern(entity))
+        self.counts.append(count)
+
+        self._entity_offsets = self._entity_cells = self._week_counts = None
+
+    def entity_series(self, entity: Hashable) -> List[int]:
+        """Plays of entity in each week"""
+        series = [0] * len(self.weeks)
+
+        entity_id = self.entities.id(entity)
+        if entity_id is None:
+            return series
+
+        self._index_entities()
+        for cell in self._entity_cells[self._entity_offsets[entity_id]:self._entity_offsets[entity_id + 1]]:
+            series[self.week_ids[cell]] += self.counts[cell]
+        return series
+
+    def rank_series(self, entity: Hashable) -> List[Optional[int]]:
+        """Rank of entity by plays in each week, 1 is the top and None when not charted"""
+        ranks = [None] * len(self.weeks)
+        if self.entities.id(entity) is None:
+            return ranks
+
+        self._index_weeks()
+        for week, count in enumerate(self.entity_series(entity)):
+            if count > 0:
+                counts = self._week_counts[week]
+                ranks[week] = len(counts) - bisect_right(counts, count) + 1
+        return ranks
+
+    def _index_entities(self):
+        """Cell positions grouped by entity with a counting sort, entity i's cells are
+        _entity_cells[_entity_offsets[i]:_entity_offsets[i + 1]]"""
+        if self._entity_offsets is not None:
+            return
+
+        offsets = array('l', [0] * (len(self.entities) + 1))
+        for i in self.entity_ids:
+            offsets[i + 1] += 1
+        for i in range(len(self.entities)):
+            offsets[i + 1] += offsets[i]
+
+        cells = array('l', [0] * len(self))
+        positions = array('l', offsets)
+        for cell, i in enumerate(self.entity_ids):
+            cells[positions[i]] = cell
+            positions[i] += 1
+
+        self._entity_offsets = offsets
+        self._entity_cells = cells
+
+    def _index_weeks(self):
+        """Ascending plays of every entity charted in each week"""
+        if self._week_counts is not None:
+            return
+
+        plays = [{} for _ in self.weeks]
+        for week, i, count in zip(self.week_ids, self.entity_ids, self.counts):
+            plays[week][i] = plays[week].get(i, 0) + count
+
+        self._week_counts = [sorted(i.values()) for i in plays]
+
+    def totals(self) -> Dict[Hashable, int]:
+        totals = [0] * len(self.entities)
+        for i, count in zip(self.entity_ids, self.counts):
+            totals[i] += count
+        return {self.entities[i]: count for i, count in enumerate(totals)}
+
+    def to_numpy(self):
+        """Coordinate arrays (week ids, entity ids, counts), requires numpy"""
+        import numpy as np
+
+        return tuple(np.frombuffer(i, dtype=f'i{i.itemsize}').copy()
+                     for i in (self.week_ids, self.entity_ids, self.counts))
+
+    def dense(self):
+        """Weeks by entities play count array, requires numpy"""
+        import numpy as np
+
+        week_ids, entity_ids, counts = self.to_numpy()
+        matrix = np.zeros(self.shape, dtype=np.int64)
+        np.add.at(matrix, (week_ids, entity_ids), counts)
+        return matrix
+
+
+class WeeklyChartHistory:
+    """Fetches a user's weekly charts across a date span concurrently.
+
+    Charts for weeks which have ended are stored in a permanent response cache so only the current week is
+    requested again on later runs"""
+
+    def __init__(self, net: Network, cache: ResponseCache = None, concurrency: int = 8):
+        self.net = net
+        self.cache = cache if cache is not None else ResponseCache.persistent('weekly.db', ttls=WEEKLY_TTLS)
+        self.concurrency = concurrency
+
+    def charts(self, username: str = None, from_date: datetime = None, to_date: datetime = None) -> List[WeeklyChart]:
+        charts = self.net.weekly_charts(username=username) or []
+        return [i for i in charts
+                if (from_date is None or i.to_date > from_date) and (to_date is None or i.from_date < to_date)]
+
+    def fetch(self,
+              object_type: str = 'artist',
+              username: str = None,
+              from_date: datetime = None,
+              to_date: datetime = None,
+              charts: List[WeeklyChart] = None) -> WeeklyChartMatrix:
+        if object_type not in OBJECT_TYPES:
+            raise ValueError('invalid object type')
+
+        username = username or self.net.username
+        if charts is None:
+            charts = self.charts(username=username, from_date=from_date, to_date=to_date)
+
+        logger.info(f'pulling {len(charts)} weekly {object_type} charts for {username}')
+
+        matrix = WeeklyChartMatrix(object_type, charts)
+        for week, resp in enumerate(self._map(lambda chart: self.chart_response(object_type, chart, username),
+                                              charts)):
+            for entity, count in self.parse_chart_response(object_type, resp):
+                matrix.add(week, entity, count)
+
+        return matrix
+
+    def fetch_all(self,
+                  username: str = None,
+                  from_date: datetime = None,
+                  to_date: datetime = None,
+                  object_types: Iterable[str] = OBJECT_TYPES) -> Dict[str, WeeklyChartMatrix]:
+        charts = self.charts(username=username, from_date=from_date, to_date=to_date)
+        return {i: self.fetch(i, username=username, charts=charts) for i in object_types}
+
+    def chart_response(self, object_type: str, chart: WeeklyChart, username: str) -> dict:
+        method = f'user.getweekly{object_type}chart'
+        params = {'user': username, 'from': chart.from_secs, 'to': chart.to_secs}
+        closed = chart.to_secs <= time()
+
+        if closed:
+            cached = self.cache.get(method, params)
+            if cached is not None:
+                return cached
+
+        resp = self.net.get_request(method=method, params=params)
+
+        if closed and resp:
+            self.cache.put(method, params, resp)
+        return resp
+
+    @staticmethod
+    def parse_chart_response(object_type: str, resp: dict):
+        """(entity, play count) pairs straight from a raw chart response"""
+        for item in resp.get(f'weekly{object_type}chart', {}).get(object_type, []):
+            count = int(item.get('playcount', 0))
+            if object_type == 'artist':
+                yield item.get('name'), count
+            else:
+                yield (item.get('name'), item.get('artist', {}).get('#text')), count
+
+    def _map(self, fn, items: List) -> Iterator:
+        """Yield fn of each item in order, each response can be released once it has been consumed"""
+        if self.concurrency <= 1 or len(items) <= 1:
+            yield from (fn(i) for i in items)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items)), thread_name_prefix='fmweekly') as pool:
+            yield from pool.map(fn, items)
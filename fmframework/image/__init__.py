@@ -1,10 +1,13 @@
+import cv2
 import numpy as np
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 from datetime import date
 
 from fmframework.net.network import Network
 from fmframework.net.scrape import UserScraper
 from fmframework.image.downloader import Downloader, ImageSizeNotAvailableException
+from fmframework.image.tiles import TileProcessor
 from fmframework.model import Image
 
 import logging
@@ -15,28 +18,59 @@ def get_blank_image(height, width):
     return np.zeros((height, width, 3), np.uint8)
 
 
-def arrange_cover_grid(images: List[np.array], width: int = 5):
+def arrange_cover_grid(images: List[np.array],
+                       width: int = 5,
+                       tile_size: Tuple[int, int] = None,
+                       padding: int = 0,
+                       background: Tuple[int, int, int] = (0, 0, 0)):
+    """Compose images into one grid buffer width tiles across, padding pixels around each tile.
+
+    Tiles are resized to tile_size (width, height), by default the first image's size. A single row is only
+    as wide as its images, a short final row is filled with background"""
+    if len(images) == 0:
+        raise ValueError('no images to arrange')
+
     logger.debug(f'arranging {len(images)} images at width {width}')
-    rows = []
-    for row in chunk(images, width):
-        row_img = row[0]
-        for image in row[1:]:
-            row_img = np.concatenate((row_img, image), axis=1)
 
-        # handle incomplete final row
-        if len(row) < width and len(rows) > 0:
-            width = rows[0].shape[1] - row_img.shape[1]
-            height = rows[0].shape[0]
-            logger.debug(rows[0].shape)
-            row_img = np.concatenate((row_img, get_blank_image(width=width, height=height)), axis=1)
+    if tile_size is None:
+        tile_size = (images[0].shape[1], images[0].shape[0])
+    tile_width, tile_height = tile_size
+
+    columns = min(width, len(images))
+    rows = -(-len(images) // columns)
+
+    grid = np.empty((rows * tile_height + (rows + 1) * padding,
+                     columns * tile_width + (columns + 1) * padding,
+                     3), np.uint8)
+    grid[:] = background
+
+    for idx, image in enumerate(images):
+        if image.shape[:2] != (tile_height, tile_width):
+            image = cv2.resize(image, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+
+        row, column = divmod(idx, columns)
+        top = padding + row * (tile_height + padding)
+        left = padding + column * (tile_width + padding)
+        grid[top:top + tile_height, left:left + tile_width] = image
+
+    return grid
 
-        rows.append(row_img)
 
-    final_img = rows[0]
-    if len(rows) > 1:
-        for row in rows[1:]:
-            final_img = np.concatenate((final_img, row), axis=0)
-    return final_img
+def encode_image(image: np.array, extension: str = '.png', quality: int = None) -> bytes:
+    """Encode an image to bytes in the format given by extension, quality applies to JPEG and WebP"""
+    extension = extension if extension.startswith('.') else f'.{extension}'
+
+    params = []
+    if quality is not None:
+        if extension.lower() in ('.jpg', '.jpeg'):
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        elif extension.lower() == '.webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+
+    success, encoded = cv2.imencode(extension, image, params)
+    if not success:
+        raise ValueError(f'failed to encode image as {extension}')
+    return encoded.tobytes()
 
 
 def get_image_grid_from_objects(objects,
@@ -46,15 +80,25 @@ def get_image_grid_from_objects(objects,
                                 overlay_count: bool = False,
                                 loader=None,
                                 check_cache=True,
-                                cache=True):
+                                cache=True,
+                                workers: int = 8,
+                                padding: int = 0,
+                                encoding: str = None,
+                                quality: int = None,
+                                processes: int = 1):
+    """Download and decode covers for objects on up to workers threads and arrange them in object order,
+    objects without an image get a blank tile and those without the requested size are left out.
+
+    Count labels are stamped by a TileProcessor, in process unless more processes are given. Returns the grid
+    as an array, or encoded bytes when an encoding extension such as '.png' is given"""
     logger.debug(f'getting {image_size.name if image_size is not None else "best"} image grid '
                  f'of {len(objects)} objects at width {image_width}')
 
     if loader is None:
-        loader = Downloader()
+        loader = Downloader(pool_size=max(workers, 1))
 
-    images = []
-    for counter, iter_object in enumerate(objects):
+    def load(indexed):
+        counter, iter_object = indexed
         logger.debug(f'downloading image {counter+1} of {len(objects)}')
         try:
             if image_size is None:
@@ -69,17 +113,31 @@ def get_image_grid_from_objects(objects,
                                                   cache=cache)
 
             if downloaded is not None:
-                if overlay_count:
-                    loader.add_scrobble_count_to_image(downloaded, iter_object.user_scrobbles)
-
-                images.append(downloaded)
+                return downloaded, iter_object.user_scrobbles if overlay_count else None
             else:
-                images.append(get_blank_image(final_scale[0], final_scale[1]))
+                return get_blank_image(final_scale[0], final_scale[1]), None
 
         except ImageSizeNotAvailableException:
             logger.error(f'{image_size.name if image_size is not None else "best"} image not available for {iter_object.name}')
 
-    grid_image = arrange_cover_grid(images=images, width=image_width)
+    if workers <= 1 or len(objects) <= 1:
+        loaded = [load(i) for i in enumerate(objects)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(objects)), thread_name_prefix='fmimage') as pool:
+            loaded = list(pool.map(load, enumerate(objects)))
+
+    loaded = [i for i in loaded if i is not None]
+
+    processor = TileProcessor(processes=processes)
+    images = processor.process_many([i[0] for i in loaded], [i[1] for i in loaded])
+
+    grid_image = arrange_cover_grid(images=images,
+                                    width=image_width,
+                                    tile_size=final_scale if image_size is None else None,
+                                    padding=padding)
+
+    if encoding is not None:
+        return encode_image(grid_image, extension=encoding, quality=quality)
     return grid_image
 
 
@@ -99,7 +157,8 @@ class AlbumChartCollage:
                             image_size: Image.Size = None,
                             image_width: int = 5,
                             check_cache=True,
-                            cache=True):
+                            cache=True,
+                            workers: int = 8):
         chart = net.top_albums(username=username,
                                period=chart_range,
                                limit=limit)
@@ -108,7 +167,8 @@ class AlbumChartCollage:
                                            image_width=image_width,
                                            overlay_count=overlay_count,
                                            check_cache=check_cache,
-                                           cache=cache)
+                                           cache=cache,
+                                           workers=workers)
 
     @staticmethod
     def from_dates(net: Network,
@@ -120,7 +180,8 @@ class AlbumChartCollage:
                    image_size: Image.Size = None,
                    image_width: int = 5,
                    check_cache=True,
-                   cache=True):
+                   cache=True,
+                   workers: int = 8):
         chart = UserScraper.album_chart(net=net,
                                         username=username,
                                         from_date=from_date,
@@ -131,4 +192,5 @@ class AlbumChartCollage:
                                            image_width=image_width,
                                            overlay_count=overlay_count,
                                            check_cache=check_cache,
-                                           cache=cache)
+                                           cache=cache,
+                                           workers=workers)
@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from time import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from fmframework import config_directory
+from fmframework.image.tiles import resize_tile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImageEntry:
+    url: str
+    file: str
+    size: int
+    last_access: float
+    validated: float
+    etag: str = None
+    last_modified: str = None
+
+
+class ImageCache:
+    """Size bounded store of downloaded cover art.
+
+    Original response bytes are written untouched to files named by the sha1 of their URL and tracked in a
+    SQLite index of size and last access, least recently used files are evicted once the total passes max_bytes.
+    Decoded images, at their original size or resized to a final_scale, are held in an in-memory LRU of
+    max_decoded entries so hot covers are not decoded again. The ETag and Last-Modified validators of each
+    response are kept alongside for conditional revalidation"""
+
+    def __init__(self,
+                 path: str = None,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 max_decoded: int = 200):
+        self.path = path or os.path.join(config_directory, 'images')
+        self.max_bytes = max_bytes
+        self.max_decoded = max_decoded
+
+        self.hits = 0
+        self.misses = 0
+
+        self._decoded = OrderedDict()
+        self._lock = Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(self.path, 'index.db'), check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS images ('
+                                 'key TEXT PRIMARY KEY, url TEXT NOT NULL, file TEXT NOT NULL, '
+                                 'size INTEGER NOT NULL, last_access REAL NOT NULL, '
+                                 'validated REAL, etag TEXT, last_modified TEXT)')
+        columns = {i[1] for i in self._connection.execute('PRAGMA table_info(images)')}
+        for column, column_type in (('validated', 'REAL'), ('etag', 'TEXT'), ('last_modified', 'TEXT')):
+            if column not in columns:
+                self._connection.execute(f'ALTER TABLE images ADD COLUMN {column} {column_type}')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)')
+        self._connection.commit()
+
+        self.total_bytes = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM images').fetchone()[0]
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def __contains__(self, url: str):
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM images WHERE key = ?',
+                                            (self.key(url),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def entry(self, url: str) -> Optional[ImageEntry]:
+        with self._lock:
+            row = self._connection.execute('SELECT url, file, size, last_access, '
+                                           'COALESCE(validated, last_access), etag, last_modified '
+                                           'FROM images WHERE key = ?', (self.key(url),)).fetchone()
+        return ImageEntry(*row) if row is not None else None
+
+    def touch(self, url: str):
+        """Mark a cached entry as revalidated against the server"""
+        now = time()
+        with self._lock:
+            self._connection.execute('UPDATE images SET last_access = ?, validated = ? WHERE key = ?',
+                                     (now, now, self.key(url)))
+            self._connection.commit()
+
+    def get_bytes(self, url: str) -> Optional[bytes]:
+        """Stored response body for url, None when not cached"""
+        key = self.key(url)
+
+        with self._lock:
+            row = self._connection.execute('SELECT file FROM images WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            try:
+                with open(os.path.join(self.path, row[0]), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                logger.warning(f'cached image file missing for {url}')
+                self._delete(key)
+                self._connection.commit()
+                return None
+
+            self._connection.execute('UPDATE images SET last_access = ? WHERE key = ?', (time(), key))
+            self._connection.commit()
+            return content
+
+    def get(self, url: str, final_scale: Tuple[int, int] = None) -> Optional[np.ndarray]:
+        """Decoded image for url, resized to final_scale (width, height) when given. Returned arrays are copies
+        so callers may draw on them"""
+        decoded_key = (self.key(url), tuple(final_scale) if final_scale is not None else None)
+
+        with self._lock:
+            image = self._decoded.get(decoded_key)
+            if image is not None:
+                self._decoded.move_to_end(decoded_key)
+                self.hits += 1
+                return image.copy()
+
+        content = self.get_bytes(url)
+        if content is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        image = self.decode(content, final_scale)
+        if image is None:
+            logger.error(f'failed to decode cached image for {url}')
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(decoded_key, image)
+        return image.copy()
+
+    def put(self,
+            url: str,
+            content: bytes,
+            final_scale: Tuple[int, int] = None,
+            etag: str = None,
+            last_modified: str = None) -> Optional[np.ndarray]:
+        """Store a response body and return it decoded at final_scale"""
+        key = self.key(url)
+        file = os.path.join(key[:2], key + self._extension(url))
+
+        os.makedirs(os.path.join(self.path, key[:2]), exist_ok=True)
+        with open(os.path.join(self.path, file), 'wb') as f:
+            f.write(content)
+
+        image = self.decode(content, final_scale)
+
+        with self._lock:
+            row = self._connection.execute('SELECT size FROM images WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+            for decoded_key in [i for i in self._decoded if i[0] == key]:
+                del self._decoded[decoded_key]
+
+            now = time()
+            self._connection.execute('INSERT OR REPLACE INTO images '
+                                     '(key, url, file, size, last_access, validated, etag, last_modified) '
+                                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                     (key, url, file, len(content), now, now, etag, last_modified))
+            self.total_bytes += len(content)
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self._connection.commit()
+
+            if image is not None:
+                self._remember((key, tuple(final_scale) if final_scale is not None else None), image)
+
+        return image.copy() if image is not None else None
+
+    def clear(self):
+        with self._lock:
+            for key, in self._connection.execute('SELECT key FROM images').fetchall():
+                self._delete(key)
+            self._connection.commit()
+            self._decoded.clear()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def decode(content: bytes, final_scale: Tuple[int, int] = None) -> Optional[np.ndarray]:
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+
+        if final_scale is not None:
+            image = resize_tile(image, final_scale)
+        return image
+
+    @staticmethod
+    def _extension(url: str) -> str:
+        _, extension = os.path.splitext(url.split('?')[0])
+        return extension if 0 < len(extension) <= 5 else ''
+
+    def _remember(self, decoded_key, image):
+        self._decoded[decoded_key] = image
+        self._decoded.move_to_end(decoded_key)
+        while len(self._decoded) > self.max_decoded:
+            self._decoded.popitem(last=False)
+
+    def _delete(self, key: str):
+        row = self._connection.execute('SELECT file, size FROM images WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return
+
+        try:
+            os.remove(os.path.join(self.path, row[0]))
+        except OSError:
+            pass
+
+        self._connection.execute('DELETE FROM images WHERE key = ?', (key,))
+        self.total_bytes -= row[1]
+
+        for decoded_key in [i for i in self._decoded if i[0] == key]:
+            del self._decoded[decoded_key]
+
+    def _evict(self):
+        rows = self._connection.execute('SELECT key, size FROM images ORDER BY last_access ASC').fetchall()
+
+        evicted = 0
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._delete(key)
+            evicted += 1
+
+        logger.debug(f'evicted {evicted} cached images, {self.total_bytes} bytes cached')
@@ -1,13 +1,14 @@
 import logging
-import os
-from typing import Union
+from time import time
+from typing import Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 import cv2
-import numpy as np
 
+from fmframework.image.cache import ImageCache
 from fmframework.model import Album, Artist, Image, Track
-from fmframework import config_directory
+from fmframework.net.ratelimit import RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -17,9 +18,25 @@ class ImageSizeNotAvailableException(Exception):
 
 
 class Downloader:
-    def __init__(self):
+    """Cover art fetcher backed by an ImageCache.
+
+    Cached covers are served without a request until revalidate_after seconds (never when None) have passed
+    since they were last confirmed, after that or when check_cache is off they are revalidated with a
+    conditional GET and a 304 reuses the stored bytes"""
+
+    def __init__(self,
+                 rate_limiter: RateLimiter = None,
+                 pool_size: int = 16,
+                 cache: ImageCache = None,
+                 revalidate_after: float = None):
         self.rsession = requests.Session()
-        self.cache_path = os.path.join(config_directory, 'cache')
+        # keep a connection per concurrent download to the image CDN
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.rsession.mount('https://', adapter)
+        self.rsession.mount('http://', adapter)
+        self.cache = cache if cache is not None else ImageCache()
+        self.rate_limiter = rate_limiter
+        self.revalidate_after = revalidate_after
 
     def image_by_size(self,
                       fm_object: Union[Track, Album, Artist],
@@ -49,13 +66,11 @@ class Downloader:
 
             for image in images:
 
-                downloaded = self.download(image_pointer=image, check_cache=check_cache, cache=cache)
+                downloaded = self.download(image_pointer=image,
+                                           check_cache=check_cache,
+                                           cache=cache,
+                                           final_scale=final_scale)
                 if downloaded is not None:
-
-                    if final_scale is not None:
-                        if downloaded.shape != final_scale:
-                            downloaded = cv2.resize(downloaded, final_scale)
-
                     return downloaded
                 else:
                     logger.error('null image returned, iterating')
@@ -87,8 +102,12 @@ class Downloader:
                     (255, 255, 255),
                     2)
 
-    def download(self, image_pointer: Image, check_cache=True, cache=True):
-        """Perform network action to download Image object"""
+    def download(self,
+                 image_pointer: Image,
+                 check_cache=True,
+                 cache=True,
+                 final_scale: Tuple[int, int] = None):
+        """Perform network action to download Image object, resized to final_scale (width, height) when given"""
 
         logger.info(f'downloading {image_pointer.size.name} image - {image_pointer.link}')
 
@@ -97,24 +116,49 @@ class Downloader:
             logger.error('invalid image url')
             return None
 
-        url_split = image_pointer.link.split('/')
-        file_path = os.path.join(self.cache_path, url_split[-2] + url_split[-1])
-
-        if check_cache and os.path.exists(file_path):
-            return cv2.imread(file_path)
-
-        resp = self.rsession.get(image_pointer.link, stream=True)
+        entry = self.cache.entry(image_pointer.link)
+
+        if entry is not None and check_cache \
+                and (self.revalidate_after is None or time() - entry.validated < self.revalidate_after):
+            image = self.cache.get(image_pointer.link, final_scale=final_scale)
+            if image is not None:
+                return image
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        resp = self.rsession.get(image_pointer.link, headers=headers)
+
+        if resp.status_code == 304 and headers:
+            logger.debug(f'{image_pointer.link} not modified')
+            self.cache.touch(image_pointer.link)
+            image = self.cache.get(image_pointer.link, final_scale=final_scale)
+            if image is not None:
+                return image
+
+            # stored copy went missing since the entry was read
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            resp = self.rsession.get(image_pointer.link)
 
         if 200 <= resp.status_code < 300:
-            image = np.asarray(bytearray(resp.content), dtype="uint8")
-            image = cv2.imdecode(image, cv2.IMREAD_COLOR)
-
-            if image.any() and cache:
-                if not os.path.exists(self.cache_path):
-                    os.makedirs(self.cache_path)
-                if not cv2.imwrite(filename=file_path, img=image):
-                    logger.error('failed to dump to cache')
+            if cache:
+                image = self.cache.put(image_pointer.link,
+                                       resp.content,
+                                       final_scale=final_scale,
+                                       etag=resp.headers.get('ETag'),
+                                       last_modified=resp.headers.get('Last-Modified'))
+            else:
+                image = ImageCache.decode(resp.content, final_scale=final_scale)
 
+            if image is None:
+                logger.error('failed to decode image')
             return image
         else:
             logger.error(f'http error {resp.status_code}')
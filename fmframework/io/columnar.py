@@ -0,0 +1,273 @@
+import logging
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from fmframework.model import Album, Artist, Scrobble, Track
+from fmframework.net.network import Network
+
+logger = logging.getLogger(__name__)
+
+
+class StringTable:
+    """Interns values to dense integer ids"""
+
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self._ids: Dict[Hashable, int] = {}
+
+    def intern(self, value: Hashable) -> int:
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self._ids[value] = idx
+            self.values.append(value)
+        return idx
+
+    def id(self, value: Hashable) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __getitem__(self, idx: int) -> Hashable:
+        return self.values[idx]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ScrobbleTable:
+    """Columnar in-memory scrobble database.
+
+    Artist, album and track names are interned into string tables, scrobbles are held as time sorted integer
+    columns of timestamps and table ids. Time ranges resolve by bisection and an artist index keeps each artist's
+    rows in time order, so range, per day and top N queries run without touching the API"""
+
+    NONE = -1
+
+    def __init__(self):
+        self.artists = StringTable()  # artist name
+        self.albums = StringTable()  # (album name, artist id)
+        self.tracks = StringTable()  # (track name, artist id)
+
+        self.artist_mbids: List[Optional[str]] = []
+        self.album_mbids: List[Optional[str]] = []
+        self.track_mbids: List[Optional[str]] = []
+
+        self.times = array('q')
+        self.artist_ids = array('l')
+        self.album_ids = array('l')
+        self.track_ids = array('l')
+
+        self._sorted = True
+        self._artist_index: Optional[Dict[int, array]] = None
+
+    @classmethod
+    def from_scrobbles(cls, scrobbles: Iterable[Scrobble]):
+        table = cls()
+        table.extend(scrobbles)
+        return table
+
+    @classmethod
+    def from_network(cls,
+                     net: Network,
+                     username: str = None,
+                     from_time: datetime = None,
+                     to_time: datetime = None,
+                     page_limit: int = 200,
+                     concurrency: int = 1):
+        return cls.from_scrobbles(net.iter_recent_tracks(username=username,
+                                                         from_time=from_time,
+                                                         to_time=to_time,
+                                                         page_limit=page_limit,
+                                                         concurrency=concurrency))
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, scrobble: Scrobble):
+        track = scrobble.track
+        artist = track.artist
+        album = track.album
+
+        artist_id = self._intern(self.artists, self.artist_mbids, artist.name, artist.mbid) \
+            if artist is not None else self.NONE
+        album_id = self._intern(self.albums, self.album_mbids, (album.name, artist_id), album.mbid) \
+            if album is not None else self.NONE
+        track_id = self._intern(self.tracks, self.track_mbids, (track.name, artist_id), track.mbid)
+
+        uts = int(scrobble.time.timestamp())
+        if self._sorted and len(self.times) > 0 and uts < self.times[-1]:
+            self._sorted = False
+
+        self.times.append(uts)
+        self.artist_ids.append(artist_id)
+        self.album_ids.append(album_id)
+        self.track_ids.append(track_id)
+        self._artist_index = None
+
+    def extend(self, scrobbles: Iterable[Scrobble]):
+        for scrobble in scrobbles:
+            self.add(scrobble)
+
+    def scrobbles(self,
+                  from_time: datetime = None,
+                  to_time: datetime = None,
+                  artist: str = None) -> Iterator[Scrobble]:
+        """Scrobbles in [from_time, to_time) oldest first, optionally for one artist"""
+        for row in self._rows(from_time, to_time, artist):
+            yield self.scrobble(row)
+
+    def count(self, from_time: datetime = None, to_time: datetime = None, artist: str = None) -> int:
+        if artist is None:
+            lower, upper = self._bounds(from_time, to_time)
+            return upper - lower
+
+        rows = self._artist_rows(artist)
+        if rows is None:
+            return 0
+        lower, upper = self._bounds(from_time, to_time, rows)
+        return upper - lower
+
+    def count_per_day(self, from_date: date = None, to_date: date = None) -> Dict[date, int]:
+        """Scrobble counts for each local day from from_date to to_date inclusive, bisecting day boundaries"""
+        self.ensure_sorted()
+        if len(self) == 0:
+            return {}
+
+        if from_date is None:
+            from_date = datetime.fromtimestamp(self.times[0]).date()
+        if to_date is None:
+            to_date = datetime.fromtimestamp(self.times[-1]).date()
+
+        counts = {}
+        day = from_date
+        lower = bisect_left(self.times, self._midnight(day))
+        while day <= to_date:
+            upper = bisect_left(self.times, self._midnight(day + timedelta(days=1)), lower)
+            counts[day] = upper - lower
+            lower = upper
+            day += timedelta(days=1)
+
+        return counts
+
+    def top_artists(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Artist]:
+        return [Artist(name=self.artists[i], mbid=self.artist_mbids[i], user_scrobbles=count)
+                for i, count in self._top('artist_ids', limit, from_time, to_time)]
+
+    def top_albums(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Album]:
+        albums = []
+        for i, count in self._top('album_ids', limit, from_time, to_time):
+            name, artist_id = self.albums[i]
+            albums.append(Album(name=name, mbid=self.album_mbids[i], artist=self.artist(artist_id),
+                                user_scrobbles=count))
+        return albums
+
+    def top_tracks(self, limit: int = 10, from_time: datetime = None, to_time: datetime = None) -> List[Track]:
+        tracks = []
+        for i, count in self._top('track_ids', limit, from_time, to_time):
+            name, artist_id = self.tracks[i]
+            tracks.append(Track(name=name, mbid=self.track_mbids[i], artist=self.artist(artist_id),
+                                user_scrobbles=count))
+        return tracks
+
+    def artist(self, artist_id: int) -> Optional[Artist]:
+        if artist_id == self.NONE:
+            return None
+        return Artist(name=self.artists[artist_id], mbid=self.artist_mbids[artist_id])
+
+    def scrobble(self, row: int) -> Scrobble:
+        artist = self.artist(self.artist_ids[row])
+
+        album = None
+        album_id = self.album_ids[row]
+        if album_id != self.NONE:
+            album = Album(name=self.albums[album_id][0], mbid=self.album_mbids[album_id], artist=artist)
+
+        track_id = self.track_ids[row]
+        track = Track(name=self.tracks[track_id][0], mbid=self.track_mbids[track_id], album=album, artist=artist)
+
+        return Scrobble(track=track, time=datetime.fromtimestamp(self.times[row]))
+
+    def _top(self, column: str, limit: int, from_time: datetime, to_time: datetime) -> List[Tuple[int, int]]:
+        lower, upper = self._bounds(from_time, to_time)
+        counts = Counter(getattr(self, column)[lower:upper])
+        counts.pop(self.NONE, None)
+        return counts.most_common(limit)
+
+    def _rows(self, from_time: datetime, to_time: datetime, artist: str = None) -> Iterable[int]:
+        if artist is None:
+            lower, upper = self._bounds(from_time, to_time)
+            return range(lower, upper)
+
+        rows = self._artist_rows(artist)
+        if rows is None:
+            return []
+        lower, upper = self._bounds(from_time, to_time, rows)
+        return rows[lower:upper]
+
+    def _artist_rows(self, artist: str) -> Optional[array]:
+        artist_id = self.artists.id(artist)
+        if artist_id is None:
+            return None
+
+        self.ensure_sorted()
+        if self._artist_index is None:
+            index = {}
+            for row, i in enumerate(self.artist_ids):
+                rows = index.get(i)
+                if rows is None:
+                    rows = index[i] = array('l')
+                rows.append(row)
+            self._artist_index = index
+
+        return self._artist_index.get(artist_id)
+
+    def _bounds(self, from_time: datetime, to_time: datetime, rows: array = None) -> Tuple[int, int]:
+        self.ensure_sorted()
+        times = self.times if rows is None else _TimeView(self.times, rows)
+
+        lower = bisect_left(times, int(from_time.timestamp())) if from_time is not None else 0
+        upper = bisect_left(times, int(to_time.timestamp()), lower) if to_time is not None else len(times)
+        return lower, upper
+
+    def ensure_sorted(self):
+        """Sort rows by time if any were added out of order, range lookups rely on it"""
+        if self._sorted:
+            return
+
+        logger.debug(f'sorting {len(self)} scrobbles')
+        order = sorted(range(len(self.times)), key=self.times.__getitem__)
+        for column in ('times', 'artist_ids', 'album_ids', 'track_ids'):
+            values = getattr(self, column)
+            setattr(self, column, array(values.typecode, (values[i] for i in order)))
+
+        self._sorted = True
+        self._artist_index = None
+
+    @staticmethod
+    def _intern(table: StringTable, mbids: List[Optional[str]], value: Hashable, mbid: Optional[str]) -> int:
+        idx = table.intern(value)
+        if idx == len(mbids):
+            mbids.append(mbid or None)
+        elif mbid and not mbids[idx]:
+            mbids[idx] = mbid
+        return idx
+
+    @staticmethod
+    def _midnight(day: date) -> int:
+        return int(datetime.combine(day, time()).timestamp())
+
+
+class _TimeView:
+    """Timestamps of a subset of rows, indexable for bisection"""
+
+    def __init__(self, times: array, rows: array):
+        self.times = times
+        self.rows = rows
+
+    def __getitem__(self, idx: int) -> int:
+        return self.times[self.rows[idx]]
+
+    def __len__(self):
+        return len(self.rows)
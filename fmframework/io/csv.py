@@ -1,29 +1,21 @@
-from csv import DictWriter
 import datetime
 import logging
-from typing import List
+import os
+from typing import Iterable
+
+from fmframework.io.export import FIELDS, export
 from fmframework.model import Scrobble
 
 logger = logging.getLogger(__name__)
-headers = ['track', 'album', 'artist', 'time', 'track id', 'album id', 'artist id']
+headers = FIELDS
 
 
-def export_scrobbles(scrobbles: List[Scrobble], path: str):
-    logger.info(f'dumping {len(scrobbles)} to {path}')
+def export_scrobbles(scrobbles: Iterable[Scrobble], path: str, file_format: str = 'csv'):
+    """Stream scrobbles to a dated file in the path directory"""
     date = str(datetime.date.today())
+    file_path = os.path.join(path, f'{date}_scrobbles.{file_format}')
 
-    with open('{}/{}_scrobbles.csv'.format(path, date), 'w') as fileobj:
-
-        writer = DictWriter(fileobj, fieldnames=headers)
-        writer.writeheader()
-
-        for scrobble in scrobbles:
-            writer.writerow({
-                'track': scrobble.track.name.replace(';', '_').replace(',', '_'),
-                'album': scrobble.track.album.name.replace(';', '_').replace(',', '_'),
-                'artist': scrobble.track.artist.name.replace(';', '_').replace(',', '_'),
-                'time': scrobble.time,
-                'track id': scrobble.track.mbid,
-                'album id': scrobble.track.album.mbid,
-                'artist id': scrobble.track.artist.mbid
-            })
+    logger.info(f'dumping scrobbles to {file_path}')
+    written = export(scrobbles, file_path, file_format=file_format)
+    logger.info(f'dumped {written} scrobbles')
+    return written
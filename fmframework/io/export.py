@@ -0,0 +1,83 @@
+import csv
+import json
+import logging
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from fmframework.model import Scrobble
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ['track', 'album', 'artist', 'time', 'track id', 'album id', 'artist id']
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def scrobble_row(scrobble: Scrobble) -> tuple:
+    """Flatten a scrobble to FIELDS order, time as the datetime"""
+    track = scrobble.track
+    album = track.album
+    artist = track.artist
+    return (track.name,
+            album.name if album is not None else None,
+            artist.name if artist is not None else None,
+            scrobble.time,
+            track.mbid,
+            album.mbid if album is not None else None,
+            artist.mbid if artist is not None else None)
+
+
+def export_csv(scrobbles: Iterable[Scrobble], path: str, chunk_size: int = 10000) -> int:
+    """Write scrobbles to a CSV file chunk_size rows at a time, returns the number written"""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as fileobj:
+        writer = csv.writer(fileobj)
+        writer.writerow(FIELDS)
+
+        for chunk in chunked(scrobbles, chunk_size):
+            writer.writerows(scrobble_row(i) for i in chunk)
+            written += len(chunk)
+
+    logger.debug(f'wrote {written} scrobbles to {path}')
+    return written
+
+
+def export_jsonl(scrobbles: Iterable[Scrobble], path: str, chunk_size: int = 10000) -> int:
+    """Write one JSON object per scrobble with the time as an ISO string and unix timestamp"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as fileobj:
+        for chunk in chunked(scrobbles, chunk_size):
+            lines = []
+            for scrobble in chunk:
+                record = dict(zip(FIELDS, scrobble_row(scrobble)))
+                record['uts'] = int(scrobble.time.timestamp())
+                record['time'] = scrobble.time.isoformat()
+                lines.append(json.dumps(record, ensure_ascii=False))
+
+            fileobj.write('\n'.join(lines) + '\n')
+            written += len(chunk)
+
+    logger.debug(f'wrote {written} scrobbles to {path}')
+    return written
+
+
+def export(scrobbles: Iterable[Scrobble], path: str, file_format: str = 'csv', chunk_size: int = None) -> int:
+    """Stream scrobbles to path as csv, jsonl or parquet (requires the parquet extra)"""
+    kwargs = {'chunk_size': chunk_size} if chunk_size is not None else {}
+
+    if file_format == 'csv':
+        return export_csv(scrobbles, path, **kwargs)
+    if file_format == 'jsonl':
+        return export_jsonl(scrobbles, path, **kwargs)
+    if file_format == 'parquet':
+        from fmframework.io.parquet import export_parquet
+        return export_parquet(scrobbles, path, **kwargs)
+
+    raise ValueError(f'unknown export format {file_format}')
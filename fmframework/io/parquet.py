@@ -0,0 +1,64 @@
+import logging
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fmframework.io.export import chunked
+from fmframework.model import Scrobble
+
+logger = logging.getLogger(__name__)
+
+_names = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ('track', _names),
+    ('album', _names),
+    ('artist', _names),
+    ('time', pa.timestamp('s', tz='UTC')),
+    ('track id', pa.string()),
+    ('album id', pa.string()),
+    ('artist id', pa.string()),
+])
+
+
+def scrobbles_to_table(scrobbles: Iterable[Scrobble]) -> pa.Table:
+    """Arrow table of scrobbles with dictionary encoded track, album and artist names"""
+    columns = {name: [] for name in SCHEMA.names}
+
+    for scrobble in scrobbles:
+        track = scrobble.track
+        album = track.album
+        artist = track.artist
+
+        columns['track'].append(track.name)
+        columns['album'].append(album.name if album is not None else None)
+        columns['artist'].append(artist.name if artist is not None else None)
+        columns['time'].append(int(scrobble.time.timestamp()))
+        columns['track id'].append(track.mbid or None)
+        columns['album id'].append((album.mbid or None) if album is not None else None)
+        columns['artist id'].append((artist.mbid or None) if artist is not None else None)
+
+    arrays = []
+    for field in SCHEMA:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[field.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def export_parquet(scrobbles: Iterable[Scrobble],
+                   path: str,
+                   chunk_size: int = 100000,
+                   compression: str = 'zstd') -> int:
+    """Write scrobbles to a Parquet file, one row group per chunk of chunk_size"""
+    written = 0
+    with pq.ParquetWriter(path, SCHEMA, compression=compression) as writer:
+        for chunk in chunked(scrobbles, chunk_size):
+            writer.write_table(scrobbles_to_table(chunk))
+            written += len(chunk)
+
+    logger.debug(f'wrote {written} scrobbles to {path}')
+    return written
@@ -0,0 +1,255 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import count, islice
+from threading import Lock
+from time import time
+from typing import Iterable, Iterator, Optional
+
+from fmframework import config_directory
+from fmframework.model import Album, Artist, Scrobble, Track
+from fmframework.net.network import Network
+
+logger = logging.getLogger(__name__)
+
+
+class IncompleteSyncException(Exception):
+    pass
+
+
+class ScrobbleStore:
+    """SQLite store of synced scrobbles with a watermark of the latest synced timestamp per user"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config_directory, 'scrobbles.db')
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = Lock()
+        self._staging = count()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS scrobbles (
+                username TEXT NOT NULL,
+                uts INTEGER NOT NULL,
+                track TEXT,
+                track_mbid TEXT,
+                track_url TEXT,
+                album TEXT,
+                album_mbid TEXT,
+                artist TEXT,
+                artist_mbid TEXT,
+                UNIQUE (username, uts, artist, track)
+            );
+            CREATE INDEX IF NOT EXISTS scrobbles_user_time ON scrobbles (username, uts);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                username TEXT PRIMARY KEY,
+                uts INTEGER NOT NULL,
+                synced REAL NOT NULL
+            );
+        ''')
+        self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def watermark(self, username: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute('SELECT uts FROM watermarks WHERE username = ?', (username,)).fetchone()
+        return row[0] if row is not None else None
+
+    def count(self, username: str, from_time: datetime = None, to_time: datetime = None) -> int:
+        query, params = self._range_query('SELECT COUNT(*) FROM scrobbles', username, from_time, to_time)
+        with self._lock:
+            return self._connection.execute(query, params).fetchone()[0]
+
+    def scrobbles(self,
+                  username: str,
+                  from_time: datetime = None,
+                  to_time: datetime = None,
+                  descending: bool = True,
+                  batch_size: int = 1000) -> Iterator[Scrobble]:
+        """Yield stored scrobbles, newest first by default to match recent_tracks, reading batch_size rows at a
+        time"""
+        query, params = self._range_query('SELECT uts, track, track_mbid, track_url, album, album_mbid, '
+                                          'artist, artist_mbid FROM scrobbles', username, from_time, to_time)
+        query += f' ORDER BY uts {"DESC" if descending else "ASC"}'
+
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+
+            for row in rows:
+                yield self.row_to_scrobble(row)
+
+    def replace(self,
+                username: str,
+                scrobbles: Iterable[Scrobble],
+                from_uts: int = None,
+                expected: int = None,
+                batch_size: int = 1000) -> int:
+        """Replace every stored scrobble at or after from_uts (all of them when None) with the given scrobbles
+        and advance the watermark.
+
+        Scrobbles stream batch_size at a time into a temporary staging table, the store is only locked while
+        each batch is written. With expected, IncompleteSyncException is raised before anything stored is
+        touched when fewer scrobbles arrive, or when none arrive over a window that still holds stored
+        scrobbles. Otherwise the window is swapped for the staged rows in a single transaction"""
+
+        staging = f'staged_scrobbles_{next(self._staging)}'
+        with self._lock:
+            self._connection.execute(f'CREATE TEMP TABLE {staging} AS SELECT * FROM scrobbles WHERE 0')
+            self._connection.commit()
+
+        try:
+            staged = 0
+            scrobbles = iter(scrobbles)
+            while True:
+                rows = [self.scrobble_to_row(username, i) for i in islice(scrobbles, batch_size)]
+                if not rows:
+                    break
+
+                with self._lock:
+                    self._connection.executemany(f'INSERT INTO {staging} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                    self._connection.commit()
+                staged += len(rows)
+
+            logger.debug(f'staged {staged} scrobbles for {username}')
+
+            if expected is not None:
+                # scrobbles submitted during the fetch can only add to the total
+                if staged < expected:
+                    raise IncompleteSyncException(f'fetched {staged} of {expected} scrobbles for {username}')
+
+                if staged == 0:
+                    # a failed first page also reads as a total of zero, never let it empty the window
+                    window_start = datetime.fromtimestamp(from_uts) if from_uts is not None else None
+                    stored = self.count(username, from_time=window_start)
+                    if stored > 0:
+                        raise IncompleteSyncException(f'no scrobbles returned for {username} over {stored} stored')
+
+            with self._lock:
+                try:
+                    if from_uts is None:
+                        self._connection.execute('DELETE FROM scrobbles WHERE username = ?', (username,))
+                    else:
+                        self._connection.execute('DELETE FROM scrobbles WHERE username = ? AND uts >= ?',
+                                                 (username, from_uts))
+
+                    self._connection.execute(f'INSERT OR IGNORE INTO scrobbles SELECT * FROM {staging}')
+
+                    latest = self._connection.execute(f'SELECT MAX(uts) FROM {staging}').fetchone()[0]
+                    if from_uts is not None:
+                        previous = self._connection.execute('SELECT uts FROM watermarks WHERE username = ?',
+                                                            (username,)).fetchone()
+                        if previous is not None:
+                            latest = previous[0] if latest is None else max(latest, previous[0])
+
+                    if latest is not None:
+                        self._connection.execute('INSERT OR REPLACE INTO watermarks (username, uts, synced) '
+                                                 'VALUES (?, ?, ?)', (username, latest, time()))
+                    self._connection.commit()
+                except BaseException:
+                    self._connection.rollback()
+                    raise
+        finally:
+            with self._lock:
+                self._connection.execute(f'DROP TABLE IF EXISTS {staging}')
+                self._connection.commit()
+
+        return staged
+
+    @staticmethod
+    def _range_query(query: str, username: str, from_time: datetime = None, to_time: datetime = None):
+        query += ' WHERE username = ?'
+        params = [username]
+        if from_time is not None:
+            query += ' AND uts >= ?'
+            params.append(int(from_time.timestamp()))
+        if to_time is not None:
+            query += ' AND uts < ?'
+            params.append(int(to_time.timestamp()))
+        return query, params
+
+    @staticmethod
+    def scrobble_to_row(username: str, scrobble: Scrobble) -> tuple:
+        track = scrobble.track
+        album = track.album
+        artist = track.artist
+        return (username,
+                int(scrobble.time.timestamp()),
+                track.name,
+                track.mbid,
+                track.url,
+                album.name if album is not None else None,
+                album.mbid if album is not None else None,
+                artist.name if artist is not None else None,
+                artist.mbid if artist is not None else None)
+
+    @staticmethod
+    def row_to_scrobble(row) -> Scrobble:
+        uts, track, track_mbid, track_url, album, album_mbid, artist, artist_mbid = row
+
+        artist_obj = Artist(name=artist, mbid=artist_mbid) if artist is not None else None
+        album_obj = Album(name=album, mbid=album_mbid, artist=artist_obj) if album is not None else None
+
+        return Scrobble(track=Track(name=track, mbid=track_mbid, url=track_url, album=album_obj, artist=artist_obj),
+                        time=datetime.fromtimestamp(uts))
+
+
+class ScrobbleSync:
+    """Incrementally sync a user's scrobbles into a ScrobbleStore.
+
+    The first run pulls the whole history, later runs only fetch from the stored watermark minus an overlap
+    window and replace that window locally so scrobbles submitted late with past timestamps, and edits or
+    deletions within the window, are picked up. The currently playing row has no timestamp and is never
+    stored"""
+
+    def __init__(self,
+                 net: Network,
+                 store: ScrobbleStore = None,
+                 overlap: timedelta = timedelta(days=14),
+                 page_limit: int = 200,
+                 concurrency: int = 1):
+        self.net = net
+        self.store = store or ScrobbleStore()
+        self.overlap = overlap
+        self.page_limit = page_limit
+        self.concurrency = concurrency
+
+    def sync(self, username: str = None) -> int:
+        """Returns the number of scrobbles added to the store"""
+
+        username = username or self.net.username
+        watermark = self.store.watermark(username)
+        before = self.store.count(username)
+
+        if watermark is None:
+            logger.info(f'no watermark for {username}, pulling full history')
+            from_uts = None
+            from_time = None
+        else:
+            from_uts = watermark - int(self.overlap.total_seconds())
+            # step back a second in case the API's from bound is exclusive, the extra row is ignored on insert
+            from_time = datetime.fromtimestamp(from_uts - 1)
+            logger.info(f'syncing {username} from {from_time}')
+
+        expected = self.net.recent_tracks_metadata(username=username, from_time=from_time).total
+        scrobbles = self.net.iter_recent_tracks(username=username,
+                                                from_time=from_time,
+                                                page_limit=self.page_limit,
+                                                concurrency=self.concurrency)
+        self.store.replace(username, scrobbles, from_uts=from_uts, expected=expected)
+
+        added = self.store.count(username) - before
+        logger.info(f'{added} scrobbles added for {username}')
+        return added
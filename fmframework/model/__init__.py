@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List
+from typing import List, Hashable
 
 
 class Image:
@@ -46,6 +46,18 @@ class LastFM:
     def __str__(self):
         return self.name
 
+    @property
+    def key(self) -> Hashable:
+        """Identity used for equality and hashing"""
+        return self.name
+
+
+def identity(value) -> Hashable:
+    """Hashable identity of a related object, which the API may give as a model, a name or a raw dict"""
+    if isinstance(value, dict):
+        return value.get('name', value.get('#text'))
+    return getattr(value, 'key', value)
+
 
 @dataclass(eq=False)
 class Artist(LastFM):
@@ -53,7 +65,10 @@ class Artist(LastFM):
         return f'{self.name}'
 
     def __eq__(self, other):
-        return self.__class__ == other.__class__ and self.name == other.name
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
 
 @dataclass(eq=False)
@@ -63,10 +78,15 @@ class Album(LastFM):
     def __str__(self):
         return f'{self.name} / {self.artist}'
 
+    @property
+    def key(self) -> Hashable:
+        return self.name, identity(self.artist)
+
     def __eq__(self, other):
-        return self.__class__ == other.__class__ \
-               and \
-               (self.name, self.artist) == (other.name, other.artist)
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
 
 @dataclass(eq=False)
@@ -78,10 +98,15 @@ class Track(LastFM):
     def __str__(self):
         return f'{self.name} / {self.album} / {self.artist}'
 
+    @property
+    def key(self) -> Hashable:
+        return self.name, identity(self.album), identity(self.artist)
+
     def __eq__(self, other):
-        return self.__class__ == other.__class__ \
-               and \
-               (self.name, self.album, self.artist) == (other.name, self.album, other.artist)
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
 
 class WeeklyChart:
@@ -107,9 +132,14 @@ class Scrobble:
     time: datetime = None
 
     def __str__(self):
-        return self.track
+        return str(self.track)
+
+    @property
+    def key(self) -> Hashable:
+        return identity(self.track), self.time
 
     def __eq__(self, other):
-        return self.__class__ == other.__class__ \
-               and \
-               (self.track, self.time) == (other.track, self.time)
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
@@ -0,0 +1,171 @@
+from datetime import datetime
+from typing import Dict, Hashable, Tuple
+
+from fmframework.model import identity
+
+
+class CompactLastFM:
+    """Slotted counterpart to LastFM for holding large scrobble histories.
+
+    Compact objects expose the same attributes as the model classes, fields that recent tracks never populate
+    are read only class level defaults. Instances from a ScrobbleInterner are shared between scrobbles so should
+    be treated as read only. Parsed recent tracks take around a fifth of the memory of the full models
+    (benchmarks/compact.py)"""
+
+    __slots__ = ('name', 'mbid')
+
+    url = None
+    listeners = None
+    play_count = None
+    user_scrobbles = None
+    wiki = None
+    images = None
+
+    def __init__(self, name: str = None, mbid: str = None):
+        self.name = name
+        self.mbid = mbid
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self})'
+
+    @property
+    def key(self) -> Hashable:
+        return self.name
+
+    def __eq__(self, other):
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class CompactArtist(CompactLastFM):
+    __slots__ = ()
+
+    def __str__(self):
+        return f'{self.name}'
+
+
+class CompactAlbum(CompactLastFM):
+    __slots__ = ('artist',)
+
+    def __init__(self, name: str = None, mbid: str = None, artist: CompactArtist = None):
+        super().__init__(name=name, mbid=mbid)
+        self.artist = artist
+
+    def __str__(self):
+        return f'{self.name} / {self.artist}'
+
+    @property
+    def key(self) -> Hashable:
+        return self.name, identity(self.artist)
+
+
+class CompactTrack(CompactLastFM):
+    __slots__ = ('url', 'album', 'artist')
+
+    duration = None
+
+    def __init__(self,
+                 name: str = None,
+                 mbid: str = None,
+                 url: str = None,
+                 album: CompactAlbum = None,
+                 artist: CompactArtist = None):
+        super().__init__(name=name, mbid=mbid)
+        self.url = url
+        self.album = album
+        self.artist = artist
+
+    def __str__(self):
+        return f'{self.name} / {self.album} / {self.artist}'
+
+    @property
+    def key(self) -> Hashable:
+        return self.name, identity(self.album), identity(self.artist)
+
+
+class CompactScrobble:
+    __slots__ = ('track', 'time')
+
+    def __init__(self, track: CompactTrack = None, time: datetime = None):
+        self.track = track
+        self.time = time
+
+    def __str__(self):
+        return str(self.track)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.track}, {self.time})'
+
+    @property
+    def key(self) -> Hashable:
+        return identity(self.track), self.time
+
+    def __eq__(self, other):
+        return self.__class__ == other.__class__ and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class ScrobbleInterner:
+    """Flyweight factory sharing one compact object per distinct (name, mbid) entity"""
+
+    def __init__(self):
+        self._artists: Dict[Tuple, CompactArtist] = {}
+        self._albums: Dict[Tuple, CompactAlbum] = {}
+        self._tracks: Dict[Tuple, CompactTrack] = {}
+
+    def __len__(self):
+        return len(self._artists) + len(self._albums) + len(self._tracks)
+
+    def artist(self, name: str, mbid: str = None) -> CompactArtist:
+        key = (name, mbid)
+        artist = self._artists.get(key)
+        if artist is None:
+            artist = self._artists[key] = CompactArtist(name=name, mbid=mbid)
+        return artist
+
+    def album(self, name: str, mbid: str = None, artist: CompactArtist = None) -> CompactAlbum:
+        key = (name, mbid, id(artist))
+        album = self._albums.get(key)
+        if album is None:
+            album = self._albums[key] = CompactAlbum(name=name, mbid=mbid, artist=artist)
+        return album
+
+    def track(self,
+              name: str,
+              mbid: str = None,
+              url: str = None,
+              album: CompactAlbum = None,
+              artist: CompactArtist = None) -> CompactTrack:
+        # artists and albums are interned first so their identity stands in for their fields
+        key = (name, mbid, url, id(album), id(artist))
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = CompactTrack(name=name, mbid=mbid, url=url, album=album, artist=artist)
+        return track
+
+    def parse_scrobble(self, scrobble_dict) -> CompactScrobble:
+        artist = None
+        if scrobble_dict.get('artist', None):
+            artist = self.artist(name=scrobble_dict['artist'].get('#text', 'n/a'),
+                                 mbid=scrobble_dict['artist'].get('mbid', None))
+
+        album = None
+        if scrobble_dict.get('album', None):
+            album = self.album(name=scrobble_dict['album'].get('#text', 'n/a'),
+                               mbid=scrobble_dict['album'].get('mbid', None),
+                               artist=artist)
+
+        track = self.track(name=scrobble_dict.get('name', 'n/a'),
+                           mbid=scrobble_dict.get('mbid', None),
+                           url=scrobble_dict.get('url', None),
+                           album=album,
+                           artist=artist)
+
+        return CompactScrobble(track=track, time=datetime.fromtimestamp(int(scrobble_dict['date']['uts'])))
@@ -0,0 +1,485 @@
+import asyncio
+import logging
+from collections import deque
+from copy import deepcopy
+from datetime import datetime, date
+from json import JSONDecodeError, loads
+from math import ceil
+from typing import Optional, List, AsyncIterator, Dict
+
+import aiohttp
+
+from fmframework.model import Album, Artist, Scrobble, Track
+from fmframework.model.compact import ScrobbleInterner
+from fmframework.net.network import BaseNetwork, LastFMNetworkException, PageCollection, Page, PageMetadata
+from fmframework.net.ratelimit import RateLimiter
+from fmframework.net.retry import RetryPolicy
+from fmframework.net.cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNetwork(BaseNetwork):
+    """asyncio counterpart to Network sharing its request building and parsing.
+
+    All calls go through one pooled aiohttp session, at most concurrency requests are in flight at once so
+    callers can gather large numbers of lookups without flooding the API"""
+
+    def __init__(self,
+                 username,
+                 api_key,
+                 concurrency: int = 10,
+                 connection_limit: int = 100,
+                 session: aiohttp.ClientSession = None,
+                 rate_limiter: RateLimiter = None,
+                 retry_policy: RetryPolicy = None,
+                 method_retry_policies: Dict[str, RetryPolicy] = None,
+                 cache: ResponseCache = None):
+        super().__init__(username=username, api_key=api_key,
+                         retry_policy=retry_policy, method_retry_policies=method_retry_policies,
+                         cache=cache)
+
+        self.concurrency = concurrency
+        self.connection_limit = connection_limit
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+        self.rate_limiter = rate_limiter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.connection_limit))
+            self._owns_session = True
+        return self._session
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def close(self):
+        """Close the session if this client created it, a session passed in is left to its owner"""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def net_call(self,
+                       http_method: str,
+                       method: str,
+                       params: dict = None,
+                       data: dict = None,
+                       json: dict = None,
+                       headers: dict = None) -> dict:
+
+        http_method = http_method.strip().upper()
+        policy = self.retry_policy_for(method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+
+            try:
+                async with self.semaphore:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire_async()
+
+                    async with self.session.request(method=http_method,
+                                                    url='http://ws.audioscrobbler.com/2.0/',
+                                                    headers=headers,
+                                                    params=params,
+                                                    json=json,
+                                                    data=data) as response:
+                        content = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if policy.retry_connection_errors and policy.can_retry(attempt):
+                    wait = policy.delay(attempt)
+                    logger.warning(f'{method} connection error {e}, retrying in {wait:.1f}s')
+                    await asyncio.sleep(wait)
+                    continue
+
+                logger.error(f'{method} connection error {e}, retry limit reached')
+                raise
+
+            try:
+                resp = loads(content) if content else None
+            except (JSONDecodeError, UnicodeDecodeError):
+                resp = None
+
+            # empty, null or non object bodies take the decode failure path, same as the blocking client
+            if not isinstance(resp, dict):
+                resp = None
+
+            retry_after = policy.parse_retry_after(response.headers.get('Retry-After'))
+
+            if resp is None:
+                if policy.should_retry(status_code=response.status) and policy.can_retry(attempt):
+                    wait = policy.delay(attempt, retry_after)
+                    logger.warning(f'{method} {response.status} retrying in {wait:.1f}s')
+                    await asyncio.sleep(wait)
+                    continue
+
+                logger.warning(f"failed to decode json from resp, {method} {response.status} -> {content}")
+                return {}
+
+            if 200 <= response.status < 300:
+                logger.debug(f'{http_method} {method} {response.status}')
+                return resp
+
+            code = resp.get('error', None)
+            message = resp.get('message', None)
+
+            if policy.should_retry(status_code=response.status, error_code=code) and policy.can_retry(attempt):
+                wait = policy.delay(attempt, retry_after)
+                logger.warning(f'{method} {response.status} {code} {message} retrying in {wait:.1f}s')
+                await asyncio.sleep(wait)
+                continue
+
+            logger.error(f'{method} {response.status} {code} {message} retry limit reached')
+            raise LastFMNetworkException(http_code=response.status, error_code=code, message=message)
+
+    async def get_request(self,
+                          method: str,
+                          params: dict = None,
+                          **kwargs) -> dict:
+        data = self.request_data(method, params, **kwargs)
+
+        if self.cache is not None:
+            cached = self.cache.get(method, data)
+            if cached is not None:
+                logger.debug(f'{method} served from cache')
+                return cached
+
+        resp = await self.net_call(http_method='GET', method=method, params=data)
+
+        if self.cache is not None and resp:
+            self.cache.put(method, data, resp)
+
+        return resp
+
+    async def user_scrobble_count(self, username: str = None) -> int:
+        if username is None:
+            username = self.username
+        logger.info(f'getting scrobble count {username}')
+        resp = await self.get_request(method='user.getinfo', user=username)
+        return int(resp.get('user', {}).get('playcount', None))
+
+    async def recent_tracks(self,
+                            username: str = None,
+                            limit: int = None,
+                            from_time: datetime = None,
+                            to_time: datetime = None,
+                            page_limit: int = 50,
+                            concurrency: int = 1,
+                            compact: bool = False) -> Optional[List[Scrobble]]:
+        return [i async for i in self.iter_recent_tracks(username=username,
+                                                         limit=limit,
+                                                         from_time=from_time,
+                                                         to_time=to_time,
+                                                         page_limit=page_limit,
+                                                         concurrency=concurrency,
+                                                         compact=compact)]
+
+    async def iter_recent_tracks(self,
+                                 username: str = None,
+                                 limit: int = None,
+                                 from_time: datetime = None,
+                                 to_time: datetime = None,
+                                 page_limit: int = 50,
+                                 concurrency: int = 1,
+                                 compact: bool = False) -> AsyncIterator[Scrobble]:
+        if limit is not None:
+            logger.info(f'pulling {limit} tracks')
+        else:
+            logger.info(f'pulling all tracks')
+
+        params = self.recent_tracks_params(username=username, from_time=from_time, to_time=to_time)
+
+        # extra response for a currently playing track without a date
+        iterator = AsyncPageCollection(net=self, method='user.getrecenttracks', params=params,
+                                       response_limit=limit + 1 if limit is not None else None,
+                                       page_limit=page_limit, concurrency=concurrency)
+
+        parse_scrobble = ScrobbleInterner().parse_scrobble if compact else self.parse_scrobble
+
+        count = 0
+        async for item in iterator:
+            if limit is not None and count >= limit:
+                return
+            if item.get('date'):
+                count += 1
+                yield parse_scrobble(item)
+
+    async def scrobbles_from_date(self,
+                                  input_date: date,
+                                  username: str = None,
+                                  limit: int = None) -> Optional[List[Scrobble]]:
+        logger.info(f'getting {input_date} scrobbles for {username or self.username}')
+        from_date, to_date = self.day_range(input_date)
+
+        return await self.recent_tracks(username=username, from_time=from_date, to_time=to_date, limit=limit)
+
+    async def count_recent_tracks(self,
+                                  username: str = None,
+                                  from_time: datetime = None,
+                                  to_time: datetime = None) -> int:
+        params = self.recent_tracks_params(username=username, from_time=from_time, to_time=to_time)
+        return await AsyncPageCollection(net=self, method='user.getrecenttracks', params=params).count()
+
+    async def count_scrobbles_from_date(self,
+                                        input_date: date,
+                                        username: str = None,
+                                        limit: int = None) -> int:
+        logger.info(f'getting {input_date} scrobble count for {username or self.username}')
+
+        if limit is None:
+            from_date, to_date = self.day_range(input_date)
+            return await self.count_recent_tracks(username=username, from_time=from_date, to_time=to_date)
+
+        scrobbles = await self.scrobbles_from_date(input_date=input_date, username=username, limit=limit)
+
+        if scrobbles:
+            return len(scrobbles)
+        else:
+            return 0
+
+    async def track(self,
+                    name: str,
+                    artist: str,
+                    username: str = None) -> Optional[Track]:
+        logger.info(f'getting {name} / {artist} for {username or self.username}')
+
+        resp = await self.get_request('track.getInfo',
+                                      track=name,
+                                      artist=artist,
+                                      user=username or self.username)
+
+        if resp.get('track'):
+            return self.parse_track(resp['track'])
+        else:
+            logger.error(f'abnormal response - {resp}')
+
+    async def album(self,
+                    name: str,
+                    artist: str,
+                    username: str = None) -> Optional[Album]:
+        logger.info(f'getting {name} / {artist} for {username or self.username}')
+
+        resp = await self.get_request('album.getInfo',
+                                      album=name,
+                                      artist=artist,
+                                      user=username or self.username)
+
+        if resp.get('album'):
+            return self.parse_album(resp['album'])
+        else:
+            logger.error(f'abnormal response - {resp}')
+
+    async def artist(self,
+                     name: str,
+                     username: str = None) -> Optional[Artist]:
+        logger.info(f'getting {name} for {username or self.username}')
+
+        resp = await self.get_request('artist.getInfo',
+                                      artist=name,
+                                      user=username or self.username)
+
+        if resp.get('artist'):
+            return self.parse_artist(resp['artist'])
+        else:
+            logger.error(f'abnormal response - {resp}')
+
+    async def _top_items(self,
+                         object_type: str,
+                         period: BaseNetwork.Range,
+                         username: str = None,
+                         limit: int = None,
+                         concurrency: int = 1) -> list:
+        if limit is not None:
+            logger.info(f'pulling top {limit} {object_type} from {period.value} for {username or self.username}')
+        else:
+            logger.info(f'pulling top {object_type} from {period.value} for {username or self.username}')
+
+        params = {
+            'user': username or self.username,
+            'period': period.value
+        }
+
+        iterator = AsyncPageCollection(net=self, method=f'user.gettop{object_type}', params=params,
+                                       response_limit=limit, concurrency=concurrency)
+        await iterator.load()
+
+        return iterator.items
+
+    async def top_tracks(self,
+                         period: BaseNetwork.Range,
+                         username: str = None,
+                         limit: int = None,
+                         concurrency: int = 1):
+        items = await self._top_items('tracks', period=period, username=username, limit=limit,
+                                      concurrency=concurrency)
+        return [self.parse_track(i) for i in items]
+
+    async def top_albums(self,
+                         period: BaseNetwork.Range,
+                         username: str = None,
+                         limit: int = None,
+                         concurrency: int = 1):
+        items = await self._top_items('albums', period=period, username=username, limit=limit,
+                                      concurrency=concurrency)
+        return [self.parse_chart_album(i) for i in items]
+
+    async def top_artists(self,
+                          period: BaseNetwork.Range,
+                          username: str = None,
+                          limit: int = None,
+                          concurrency: int = 1):
+        items = await self._top_items('artists', period=period, username=username, limit=limit,
+                                      concurrency=concurrency)
+        return [self.parse_artist(i) for i in items]
+
+    async def weekly_charts(self, username: str = None):
+        logger.info('getting weekly chart list')
+
+        resp = await self.get_request('user.getweeklychartlist', user=username or self.username)
+        if resp:
+            return self.parse_weekly_charts(resp)
+        else:
+            logger.error('no response')
+
+    async def weekly_chart(self,
+                           object_type,
+                           chart=None,
+                           from_time: int = None,
+                           to_time: int = None,
+                           username: str = None,
+                           limit: int = None):
+
+        params = self.weekly_chart_params(object_type=object_type, chart=chart, from_time=from_time,
+                                          to_time=to_time, username=username, limit=limit)
+
+        resp = await self.get_request(method=f'user.getweekly{object_type}chart', params=params)
+
+        if resp:
+            return self.parse_weekly_chart(object_type, resp)
+        else:
+            logger.error('no response')
+
+
+class AsyncPageCollection:
+    def __init__(self,
+                 net: AsyncNetwork,
+                 method: str,
+                 params: dict = None,
+                 page_limit: int = 50,
+                 response_limit: int = 50,
+                 concurrency: int = 1):
+        self.net = net
+        self.method = method
+        self.params = params
+        self.pages: List[Page] = []
+        self.page_limit = min(page_limit, 200)
+        self.response_limit = response_limit
+        self.concurrency = max(concurrency, 1)
+
+    def __len__(self):
+        return sum(len(page) for page in self.pages)
+
+    @property
+    def total(self):
+        if len(self.pages) > 0:
+            return self.pages[0].total
+        return 0
+
+    @property
+    def items(self):
+        items = []
+        for page in self.pages:
+            items += page.items
+        return items[:self.response_limit]
+
+    async def __aiter__(self):
+        count = 0
+        async for page in self.iter_pages():
+            for item in page.items:
+                if self.response_limit and count >= self.response_limit:
+                    return
+                count += 1
+                yield item
+
+    async def load(self):
+        async for page in self.iter_pages():
+            self.pages.append(page)
+
+    async def iter_pages(self):
+        """Yield pages in page order, at most concurrency pages after the first are requested at once"""
+
+        first_page = await self.get_page(1)
+        if first_page is None or len(first_page) == 0:
+            return
+
+        loaded = len(first_page)
+        last_page = first_page.total_pages
+        yield first_page
+        # only the pages in flight should stay referenced
+        del first_page
+
+        if self.response_limit:
+            last_page = min(last_page, ceil(self.response_limit / self.page_limit))
+
+        pending = deque()
+        next_number = 2
+        try:
+            while not (self.response_limit and loaded >= self.response_limit):
+                while next_number <= last_page and len(pending) < self.concurrency:
+                    pending.append(asyncio.ensure_future(self.get_page(next_number)))
+                    next_number += 1
+
+                if not pending:
+                    return
+
+                page = await pending.popleft()
+                if page is None or len(page) == 0:
+                    return
+
+                loaded += len(page)
+                yield page
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def metadata(self) -> PageMetadata:
+        page = await self.get_page(1, limit=1)
+        if page is None:
+            return PageMetadata(total=0, total_pages=0, page_limit=self.page_limit)
+
+        return PageMetadata(total=page.total,
+                            total_pages=ceil(page.total / self.page_limit),
+                            page_limit=self.page_limit)
+
+    async def count(self) -> int:
+        return (await self.metadata()).total
+
+    async def get_page(self, number: int, limit: int = None) -> Optional[Page]:
+        logger.debug(f'iterating {self.method} page {number}')
+
+        params = deepcopy(self.params)
+
+        params.update({
+            'limit': limit or self.page_limit,
+            'page': number
+        })
+        resp = await self.net.get_request(method=self.method, params=params)
+
+        if resp:
+            return PageCollection.parse_page(resp)
+        else:
+            logger.error('no response')
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+from time import time
+from typing import Dict, Optional
+
+from fmframework import config_directory
+
+logger = logging.getLogger(__name__)
+
+# seconds, None never expires
+DEFAULT_TTLS = {
+    'track.getinfo': 7 * 24 * 60 * 60,
+    'album.getinfo': 7 * 24 * 60 * 60,
+    'artist.getinfo': 7 * 24 * 60 * 60,
+}
+
+_IGNORED_PARAMS = {'api_key', 'format', 'method'}
+
+
+class ResponseCache:
+    """API response cache keyed on method and normalised parameters.
+
+    Responses live in an in-memory LRU of max_entries, optionally backed by a SQLite store at path which keeps
+    up to max_disk_entries by last access. Only methods with an entry in ttls are cached"""
+
+    def __init__(self,
+                 max_entries: int = 10000,
+                 ttls: Dict[str, Optional[float]] = None,
+                 path: str = None,
+                 max_disk_entries: int = 200000):
+        self.max_entries = max_entries
+        self.ttls = {i.lower(): j for i, j in (ttls if ttls is not None else DEFAULT_TTLS).items()}
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._puts = 0
+
+        self._connection = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                                     'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                                     'expires REAL, last_access REAL NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_last_access '
+                                     'ON responses (last_access)')
+            self._connection.commit()
+
+    @classmethod
+    def persistent(cls, filename: str = 'responses.db', **kwargs):
+        """Cache backed by a SQLite store in the config directory"""
+        return cls(path=os.path.join(config_directory, filename), **kwargs)
+
+    def cacheable(self, method: str) -> bool:
+        return method.lower() in self.ttls
+
+    @staticmethod
+    def key(method: str, params: dict) -> str:
+        normalised = sorted((str(i), str(j).strip().casefold())
+                            for i, j in params.items()
+                            if i not in _IGNORED_PARAMS and j is not None)
+        return json.dumps([method.lower(), normalised], ensure_ascii=False)
+
+    def get(self, method: str, params: dict) -> Optional[dict]:
+        if not self.cacheable(method):
+            return None
+
+        key = self.key(method, params)
+        now = time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return deepcopy(value)
+                del self._memory[key]
+
+            if self._connection is not None:
+                row = self._connection.execute('SELECT value, expires FROM responses WHERE key = ?',
+                                               (key,)).fetchone()
+                if row is not None:
+                    if row[1] is None or row[1] > now:
+                        self._connection.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                        self._connection.commit()
+
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.hits += 1
+                        return deepcopy(value)
+
+                    self._connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._connection.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, method: str, params: dict, value: dict):
+        if not self.cacheable(method):
+            return
+
+        key = self.key(method, params)
+        now = time()
+        ttl = self.ttls[method.lower()]
+        expires = now + ttl if ttl is not None else None
+
+        with self._lock:
+            self._remember(key, expires, deepcopy(value))
+
+            if self._connection is not None:
+                self._connection.execute('INSERT OR REPLACE INTO responses (key, value, expires, last_access) '
+                                         'VALUES (?, ?, ?, ?)', (key, json.dumps(value), expires, now))
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    self._evict_disk()
+                self._connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM responses')
+                self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, expires, value):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        self._connection.execute('DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?', (time(),))
+        self._connection.execute('DELETE FROM responses WHERE key IN '
+                                 '(SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                                 (self.max_disk_entries,))
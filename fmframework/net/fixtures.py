@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+from threading import Lock
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureResponse:
+    """Replayed page exposing the parts of requests.Response the scrapers read"""
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict[str, str] = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def __repr__(self):
+        return f'FixtureResponse({self.status_code}, {self.url})'
+
+
+class FixtureStore:
+    """Directory of recorded page bodies for replaying scrapes offline.
+
+    Bodies are written to files named by the sha1 of their URL, index.json maps each URL to its file and
+    response status. Index entries may point at any file in the directory so hand named pages can be
+    replayed too"""
+
+    INDEX = 'index.json'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = Lock()
+        self._index = {}
+
+        index_path = os.path.join(directory, self.INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, url: str):
+        return url in self._index
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def record(self, url: str, response):
+        """Write a response's body to the store and index it under url"""
+        filename = f'{self.key(url)}.html'
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, filename), 'wb') as f:
+                f.write(response.content)
+
+            self._index[url] = {
+                'file': filename,
+                'status_code': response.status_code,
+                'content_type': response.headers.get('Content-Type'),
+            }
+            self._write_index()
+
+        logger.debug(f'recorded {url} to {filename}')
+
+    def replay(self, url: str) -> FixtureResponse:
+        entry = self._index.get(url)
+        if entry is None:
+            raise KeyError(f'no fixture recorded for {url}')
+
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            content = f.read()
+
+        headers = {'Content-Type': entry['content_type']} if entry.get('content_type') else {}
+        return FixtureResponse(url=url, status_code=entry['status_code'], content=content, headers=headers)
+
+    def _write_index(self):
+        index_path = os.path.join(self.directory, self.INDEX)
+        temp_path = f'{index_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(temp_path, index_path)
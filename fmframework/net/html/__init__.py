@@ -0,0 +1,93 @@
+import logging
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChartRow:
+    """Fields of one last.fm chartlist row, independent of the parser that read it"""
+    name: str = None
+    url: str = None
+    album: str = None
+    album_url: str = None
+    count: str = None
+    timestamp: str = None
+    titles: List[str] = field(default_factory=list)
+
+
+class ParserBackend:
+    """Pulls chartlist rows and the pagination page count out of a last.fm library page"""
+    name: str = None
+
+    def parse(self, content: bytes) -> Tuple[List[ChartRow], int]:
+        raise NotImplementedError
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup over the given tree builder, html.parser is pure Python"""
+
+    def __init__(self, features: str = 'html.parser'):
+        self.features = features
+        self.name = f'bs4/{features}'
+
+    def parse(self, content: bytes) -> Tuple[List[ChartRow], int]:
+        parser = BeautifulSoup(content, self.features)
+
+        rows = []
+        for row in parser.find_all('tr'):
+            name_cell = row.find('td', class_='chartlist-name')
+            if name_cell is None:
+                continue
+
+            chart_row = ChartRow(titles=[i['title'] for i in row.find_all('a', title=True)])
+
+            name_link = name_cell.find('a')
+            if name_link is not None:
+                chart_row.name = name_link.string
+                chart_row.url = name_link.get('href')
+
+            album_cell = row.find('td', class_='chartlist-album')
+            if album_cell is not None and album_cell.find('a') is not None:
+                chart_row.album = album_cell.find('a').string
+                chart_row.album_url = album_cell.find('a').get('href')
+
+            count_cell = row.find(class_='chartlist-count-bar-value')
+            if count_cell is not None and count_cell.contents:
+                chart_row.count = str(count_cell.contents[0])
+
+            timestamp_cell = row.find('td', class_='chartlist-timestamp')
+            if timestamp_cell is not None and timestamp_cell.find('span') is not None:
+                chart_row.timestamp = timestamp_cell.find('span').string
+
+            rows.append(chart_row)
+
+        return rows, len(parser.find_all('li', class_='pagination-page'))
+
+
+def get_backend(name: str = 'auto') -> ParserBackend:
+    """Parser backend by name, auto picks the fastest installed of selectolax, lxml and html.parser"""
+
+    if name == 'auto':
+        for candidate in ('selectolax', 'lxml'):
+            try:
+                return get_backend(candidate)
+            except ImportError:
+                pass
+        return SoupBackend()
+
+    if name == 'selectolax':
+        from fmframework.net.html.selectolax_backend import SelectolaxBackend
+        return SelectolaxBackend()
+    if name == 'lxml':
+        from fmframework.net.html.lxml_backend import LxmlBackend
+        return LxmlBackend()
+    if name in ('html.parser', 'bs4'):
+        return SoupBackend()
+    if name.startswith('bs4/'):
+        return SoupBackend(features=name[4:])
+
+    raise ValueError(f'unknown parser backend {name}')
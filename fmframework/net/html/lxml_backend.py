@@ -0,0 +1,52 @@
+from typing import List, Tuple
+
+from lxml import html as lxml_html
+
+from fmframework.net.html import ChartRow, ParserBackend
+
+
+def _has_class(class_name: str) -> str:
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+_ROWS = f'//tr[td[{_has_class("chartlist-name")}]]'
+_NAME_LINK = f'./td[{_has_class("chartlist-name")}]//a'
+_ALBUM_LINK = f'./td[{_has_class("chartlist-album")}]//a'
+_COUNT = f'.//*[{_has_class("chartlist-count-bar-value")}]'
+_TIMESTAMP = f'./td[{_has_class("chartlist-timestamp")}]//span'
+_TITLES = './/a/@title'
+_PAGES = f'count(//li[{_has_class("pagination-page")}])'
+
+
+class LxmlBackend(ParserBackend):
+    """libxml2 tree with targeted XPath selectors for the chartlist rows"""
+    name = 'lxml'
+
+    def parse(self, content: bytes) -> Tuple[List[ChartRow], int]:
+        tree = lxml_html.fromstring(content)
+
+        rows = []
+        for row in tree.xpath(_ROWS):
+            chart_row = ChartRow(titles=[str(i) for i in row.xpath(_TITLES)])
+
+            name_link = row.xpath(_NAME_LINK)
+            if name_link:
+                chart_row.name = name_link[0].text
+                chart_row.url = name_link[0].get('href')
+
+            album_link = row.xpath(_ALBUM_LINK)
+            if album_link:
+                chart_row.album = album_link[0].text
+                chart_row.album_url = album_link[0].get('href')
+
+            count = row.xpath(_COUNT)
+            if count:
+                chart_row.count = count[0].text
+
+            timestamp = row.xpath(_TIMESTAMP)
+            if timestamp:
+                chart_row.timestamp = timestamp[0].text
+
+            rows.append(chart_row)
+
+        return rows, int(tree.xpath(_PAGES))
@@ -0,0 +1,43 @@
+from typing import List, Tuple
+
+from selectolax.parser import HTMLParser
+
+from fmframework.net.html import ChartRow, ParserBackend
+
+
+class SelectolaxBackend(ParserBackend):
+    """Modest C parser with CSS selectors reading only the chartlist rows"""
+    name = 'selectolax'
+
+    def parse(self, content: bytes) -> Tuple[List[ChartRow], int]:
+        tree = HTMLParser(content)
+
+        rows = []
+        for row in tree.css('tr'):
+            name_cell = row.css_first('td.chartlist-name')
+            if name_cell is None:
+                continue
+
+            chart_row = ChartRow(titles=[i.attributes['title'] for i in row.css('a[title]')])
+
+            name_link = name_cell.css_first('a')
+            if name_link is not None:
+                chart_row.name = name_link.text()
+                chart_row.url = name_link.attributes.get('href')
+
+            album_link = row.css_first('td.chartlist-album a')
+            if album_link is not None:
+                chart_row.album = album_link.text()
+                chart_row.album_url = album_link.attributes.get('href')
+
+            count = row.css_first('.chartlist-count-bar-value')
+            if count is not None:
+                chart_row.count = count.text(deep=False)
+
+            timestamp = row.css_first('td.chartlist-timestamp span')
+            if timestamp is not None:
+                chart_row.timestamp = timestamp.text()
+
+            rows.append(chart_row)
+
+        return rows, len(tree.css('li.pagination-page'))
@@ -1,7 +1,11 @@
 import requests
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, List, Iterator, Dict
 from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from math import ceil
 import logging
 from time import sleep
 from enum import Enum
@@ -10,6 +14,10 @@ from datetime import datetime, date, time, timedelta
 from requests import JSONDecodeError
 
 from fmframework.model import Album, Artist, Image, Wiki, WeeklyChart, Scrobble, Track
+from fmframework.model.compact import ScrobbleInterner
+from fmframework.net.ratelimit import RateLimiter
+from fmframework.net.retry import RetryPolicy
+from fmframework.net.cache import ResponseCache
 
 
 logger = logging.getLogger(__name__)
@@ -25,7 +33,8 @@ class LastFMNetworkException(Exception):
         return "Last.fm Network Exception: (%s/%s) %s" % (self.http_code, self.error_code, self.message)
 
 
-class Network:
+class BaseNetwork:
+    """Request building and response parsing shared by the blocking and asyncio clients"""
 
     class Range(Enum):
         OVERALL = 'overall'
@@ -35,12 +44,212 @@ class Network:
         HALFYEAR = '6month'
         YEAR = '12month'
 
-    def __init__(self, username, api_key):
+    def __init__(self,
+                 username,
+                 api_key,
+                 retry_policy: RetryPolicy = None,
+                 method_retry_policies: Dict[str, RetryPolicy] = None,
+                 cache: ResponseCache = None):
         self.api_key = api_key
-        
+
         self.username = username
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.method_retry_policies = method_retry_policies or {}
+        self.cache = cache
+
+    def retry_policy_for(self, method: str) -> RetryPolicy:
+        return self.method_retry_policies.get(method, self.retry_policy)
+
+    def request_data(self,
+                     method: str,
+                     params: dict = None,
+                     **kwargs) -> dict:
+        data = {
+                "format": 'json',
+                "method": method,
+                "api_key": self.api_key,
+                }
+        if params is not None:
+            data.update(params)
+        if kwargs is not None:
+            data.update({i: j for i, j in kwargs.items() if j is not None})
+
+        return data
+
+    def recent_tracks_params(self,
+                             username: str = None,
+                             from_time: datetime = None,
+                             to_time: datetime = None) -> dict:
+        params = {
+            'user': username or self.username
+        }
+
+        if from_time is not None:
+            params['from'] = int(from_time.timestamp())
+        if to_time is not None:
+            params['to'] = int(to_time.timestamp())
+
+        return params
+
+    @staticmethod
+    def day_range(input_date: date):
+        midnight = time(hour=0, minute=0, second=0)
+
+        from_date = datetime.combine(date=input_date, time=midnight)
+        to_date = datetime.combine(date=input_date + timedelta(days=1), time=midnight)
+
+        return from_date, to_date
+
+    def weekly_chart_params(self,
+                            object_type,
+                            chart: WeeklyChart = None,
+                            from_time: int = None,
+                            to_time: int = None,
+                            username: str = None,
+                            limit: int = None) -> dict:
+
+        if object_type not in ['album', 'artist', 'track']:
+            raise ValueError('invalid object type')
+
+        if chart is None and (from_time is None or to_time is None):
+            raise ValueError('no time range')
+
+        if chart is None:
+            chart = WeeklyChart(from_time=from_time, to_time=to_time)
+
+        if limit is not None:
+            logger.info(f'pulling top {limit} {object_type}s from {chart.from_date} to {chart.to_date} '
+                        f'for {username or self.username}')
+        else:
+            logger.info(f'pulling top {object_type}s from {chart.from_date} to {chart.to_date} '
+                        f'for {username or self.username}')
+
+        return {
+            'user': username or self.username,
+            'from': chart.from_secs,
+            'to': chart.to_secs
+        }
+
+    def parse_weekly_chart(self, object_type, resp: dict):
+        if object_type == 'track':
+            return [self.parse_track(i) for i in resp.get('weeklytrackchart', {}).get('track', [])]
+        elif object_type == 'album':
+            return [self.parse_album(i) for i in resp.get('weeklyalbumchart', {}).get('album', [])]
+        elif object_type == 'artist':
+            return [self.parse_artist(i) for i in resp.get('weeklyartistchart', {}).get('artist', [])]
+
+    @staticmethod
+    def parse_weekly_charts(resp: dict) -> List[WeeklyChart]:
+        return [WeeklyChart(from_time=int(i['from']), to_time=int(i['to']))
+                for i in resp.get('weeklychartlist', {}).get('chart', [])]
+
+    @staticmethod
+    def parse_wiki(wiki_dict) -> Optional[Wiki]:
+        if wiki_dict:
+            return Wiki(published=datetime.strptime(wiki_dict.get('published', None), '%d %b %Y, %H:%M'),
+                        summary=wiki_dict.get('summary', None),
+                        content=wiki_dict.get('content', None))
+        else:
+            return None
+
+    def parse_artist(self, artist_dict) -> Artist:
+        return Artist(name=artist_dict.get('name', 'n/a'),
+                      url=artist_dict.get('url', None),
+                      mbid=artist_dict.get('mbid', None),
+                      listeners=int(artist_dict.get('stats', {}).get('listeners', 0)),
+                      play_count=int(artist_dict.get('stats', {}).get('playcount', 0)),
+                      user_scrobbles=int(artist_dict.get('stats', {}).get('userplaycount',
+                                                                          artist_dict.get('playcount', 0))),
+                      wiki=self.parse_wiki(artist_dict['wiki']) if artist_dict.get('wiki', None) else None,
+                      images=[self.parse_image(i) for i in artist_dict.get('image', [])])
+
+    def parse_album(self, album_dict) -> Album:
+        return Album(name=album_dict.get('name', album_dict.get('title', 'n/a')),
+                     url=album_dict.get('url', 'n/a'),
+                     mbid=album_dict.get('mbid', 'n/a'),
+                     listeners=int(album_dict.get('listeners', 0)),
+                     play_count=int(album_dict.get('playcount', 0)),
+                     user_scrobbles=int(album_dict.get('userplaycount', 0) if album_dict.get('userplaycount', 0) is not dict else 0),
+                     wiki=self.parse_wiki(album_dict['wiki']) if album_dict.get('wiki', None) else None,
+                     artist=album_dict.get('artist'),
+                     images=[self.parse_image(i) for i in album_dict.get('image', [])])
+
+    def parse_chart_album(self, album_dict) -> Album:
+        return Album(name=album_dict.get('name', album_dict.get('title', 'n/a')),
+                     url=album_dict.get('url', 'n/a'),
+                     mbid=album_dict.get('mbid', 'n/a'),
+                     listeners=int(album_dict.get('listeners', 0)),
+                     user_scrobbles=int(album_dict.get('playcount', 0)),
+                     wiki=self.parse_wiki(album_dict['wiki']) if album_dict.get('wiki', None) else None,
+                     artist=album_dict.get('artist'),
+                     images=[self.parse_image(i) for i in album_dict.get('image', [])])
+
+    def parse_track(self, track_dict) -> Track:
+        track = Track(name=track_dict.get('name', 'n/a'),
+                      url=track_dict.get('url', 'n/a'),
+                      mbid=track_dict.get('mbid', 'n/a'),
+                      listeners=int(track_dict.get('listeners', 0)),
+                      play_count=int(track_dict.get('playcount', 0)),
+                      duration=int(track_dict['duration']) if track_dict.get('duration') else None,
+                      user_scrobbles=int(track_dict.get('userplaycount', 0)),
+                      wiki=self.parse_wiki(track_dict['wiki']) if track_dict.get('wiki', None) else None,
+                      images=[self.parse_image(i) for i in track_dict.get('image', [])])
+
+        if track_dict.get('album', None):
+            track.album = self.parse_album(track_dict['album'])
+
+        if track_dict.get('artist', None):
+            track.artist = self.parse_artist(track_dict['artist'])
+
+        return track
+
+    @staticmethod
+    def parse_image(image_dict) -> Image:
+        try:
+            return Image(size=Image.Size[image_dict['size']], link=image_dict['#text'])
+        except KeyError:
+            return Image(size=Image.Size['other'], link=image_dict['#text'])
+
+    @staticmethod
+    def parse_scrobble(scrobble_dict) -> Scrobble:
+        album = None
+        if scrobble_dict.get('album', None):
+            album = Album(name=scrobble_dict['album'].get('#text', 'n/a'),
+                          mbid=scrobble_dict['album'].get('mbid', None))
+
+        artist = None
+        if scrobble_dict.get('artist', None):
+            artist = Artist(name=scrobble_dict['artist'].get('#text', 'n/a'),
+                            mbid=scrobble_dict['artist'].get('mbid', None))
+
+        if artist is not None and album is not None:
+            if album.artist is None:
+                album.artist = artist
+
+        track = Track(name=scrobble_dict.get('name', 'n/a'),
+                      album=album,
+                      artist=artist,
+                      mbid=scrobble_dict.get('mbid', None),
+                      url=scrobble_dict.get('url', None))
+
+        return Scrobble(track=track, time=datetime.fromtimestamp(int(scrobble_dict['date']['uts'])))
+
+
+class Network(BaseNetwork):
+
+    def __init__(self,
+                 username,
+                 api_key,
+                 rate_limiter: RateLimiter = None,
+                 retry_policy: RetryPolicy = None,
+                 method_retry_policies: Dict[str, RetryPolicy] = None,
+                 cache: ResponseCache = None):
+        super().__init__(username=username, api_key=api_key,
+                         retry_policy=retry_policy, method_retry_policies=method_retry_policies,
+                         cache=cache)
+
         self.rsession = requests.Session()
-        self.retry_counter = 0
+        self.rate_limiter = rate_limiter
 
     def net_call(self,
                  http_method: str,
@@ -51,63 +260,78 @@ class Network:
                  headers: dict = None) -> dict:
 
         http_method = http_method.strip().upper()
-
-        response = self.rsession.request(method=http_method,
-                                         url='http://ws.audioscrobbler.com/2.0/',
-                                         headers=headers,
-                                         params=params,
-                                         json=json,
-                                         data=data)
-
-        try:
-            resp = response.json()
+        policy = self.retry_policy_for(method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                response = self.rsession.request(method=http_method,
+                                                 url='http://ws.audioscrobbler.com/2.0/',
+                                                 headers=headers,
+                                                 params=params,
+                                                 json=json,
+                                                 data=data)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if policy.retry_connection_errors and policy.can_retry(attempt):
+                    wait = policy.delay(attempt)
+                    logger.warning(f'{method} connection error {e}, retrying in {wait:.1f}s')
+                    sleep(wait)
+                    continue
+
+                logger.error(f'{method} connection error {e}, retry limit reached')
+                raise
+
+            try:
+                resp = response.json()
+            except JSONDecodeError:
+                if policy.should_retry(status_code=response.status_code) and policy.can_retry(attempt):
+                    wait = policy.delay(attempt, policy.parse_retry_after(response.headers.get('Retry-After')))
+                    logger.warning(f'{method} {response.status_code} retrying in {wait:.1f}s')
+                    sleep(wait)
+                    continue
+
+                logger.warning(f"failed to decode json from resp, {method} {response} -> {response.content}")
+                return {}
 
             if 200 <= response.status_code < 300:
                 logger.debug(f'{http_method} {method} {response.status_code}')
-                self.retry_counter = 0
                 return resp
 
             code = resp.get('error', None)
             message = resp.get('message', None)
 
-            if code:
-                if code in [8, 11, 16]:
-                    if self.retry_counter < 5:
-                        self.retry_counter += 1
-                        sleep(2)
-                        logger.warning(f'{method} {response.status_code} {code} {message} retrying')
-                        return self.net_call(http_method=http_method,
-                                             method=method,
-                                             params=params,
-                                             data=data,
-                                             json=json,
-                                             headers=headers)
-                    else:
-                        self.retry_counter = 0
+            if policy.should_retry(status_code=response.status_code, error_code=code) and policy.can_retry(attempt):
+                wait = policy.delay(attempt, policy.parse_retry_after(response.headers.get('Retry-After')))
+                logger.warning(f'{method} {response.status_code} {code} {message} retrying in {wait:.1f}s')
+                sleep(wait)
+                continue
 
             logger.error(f'{method} {response.status_code} {code} {message} retry limit reached')
             raise LastFMNetworkException(http_code=response.status_code, error_code=code, message=message)
 
-        except JSONDecodeError:
-            logger.warning(f"failed to decode json from resp, {method} {response} -> {response.content}")
-            return {}
-
     def get_request(self,
                     method: str,
                     params: dict = None,
                     **kwargs) -> dict:
-       
-        data = {
-                "format": 'json',
-                "method": method,
-                "api_key": self.api_key,
-                }
-        if params is not None:
-            data.update(params)
-        if kwargs is not None:
-            data.update({i: j for i, j in kwargs.items() if j is not None})
+        data = self.request_data(method, params, **kwargs)
+
+        if self.cache is not None:
+            cached = self.cache.get(method, data)
+            if cached is not None:
+                logger.debug(f'{method} served from cache')
+                return cached
+
+        resp = self.net_call(http_method='GET', method=method, params=data)
+
+        if self.cache is not None and resp:
+            self.cache.put(method, data, resp)
 
-        return self.net_call(http_method='GET', method=method, params=data)
+        return resp
 
     def user_scrobble_count(self, username: str = None) -> int:
         if username is None:
@@ -124,47 +348,95 @@ class Network:
                       limit: int = None,
                       from_time: datetime = None,
                       to_time: datetime = None,
-                      page_limit: int = 50) -> Optional[List[Scrobble]]:
+                      page_limit: int = 50,
+                      concurrency: int = 1,
+                      compact: bool = False) -> Optional[List[Scrobble]]:
+        return list(self.iter_recent_tracks(username=username,
+                                            limit=limit,
+                                            from_time=from_time,
+                                            to_time=to_time,
+                                            page_limit=page_limit,
+                                            concurrency=concurrency,
+                                            compact=compact))
+
+    def iter_recent_tracks(self,
+                           username: str = None,
+                           limit: int = None,
+                           from_time: datetime = None,
+                           to_time: datetime = None,
+                           page_limit: int = 50,
+                           concurrency: int = 1,
+                           compact: bool = False) -> Iterator[Scrobble]:
+        """Stream scrobbles page by page, only the pages in flight are held in memory.
+
+        With compact, scrobbles are slotted objects sharing one interned instance per distinct track, album and
+        artist"""
         if limit is not None:
             logger.info(f'pulling {limit} tracks')
         else:
             logger.info(f'pulling all tracks')
 
-        params = {
-            'user': username or self.username
-        }
-
-        if from_time is not None:
-            params['from'] = int(from_time.timestamp())
-        if to_time is not None:
-            params['to'] = int(to_time.timestamp())
+        params = self.recent_tracks_params(username=username, from_time=from_time, to_time=to_time)
 
-        iterator = PageCollection(net=self, method='user.getrecenttracks', params=params, response_limit=limit, page_limit=page_limit)
-        iterator.response_limit = limit + 1 if limit is not None else None
-        iterator.load()
+        # extra response for a currently playing track without a date
+        iterator = PageCollection(net=self, method='user.getrecenttracks', params=params,
+                                  response_limit=limit + 1 if limit is not None else None,
+                                  page_limit=page_limit, concurrency=concurrency)
 
-        items = iterator.items
+        parse_scrobble = ScrobbleInterner().parse_scrobble if compact else self.parse_scrobble
 
-        return [self.parse_scrobble(i) for i in items[:limit] if i.get('date')]
+        scrobbles = (parse_scrobble(i) for i in iterator if i.get('date'))
+        return islice(scrobbles, limit)
 
     def scrobbles_from_date(self,
                             input_date: date,
                             username: str = None,
                             limit: int = None) -> Optional[List[Scrobble]]:
         logger.info(f'getting {input_date} scrobbles for {username or self.username}')
-        midnight = time(hour=0, minute=0, second=0)
-
-        from_date = datetime.combine(date=input_date, time=midnight)
-        to_date = datetime.combine(date=input_date + timedelta(days=1), time=midnight)
+        from_date, to_date = self.day_range(input_date)
 
         return self.recent_tracks(username=username, from_time=from_date, to_time=to_date, limit=limit)
 
+    def iter_recent_timestamps(self,
+                               username: str = None,
+                               from_time: datetime = None,
+                               to_time: datetime = None,
+                               page_limit: int = 200,
+                               concurrency: int = 1) -> Iterator[int]:
+        """Stream the unix timestamps of scrobbles straight from the raw pages without building models"""
+        params = self.recent_tracks_params(username=username, from_time=from_time, to_time=to_time)
+
+        iterator = PageCollection(net=self, method='user.getrecenttracks', params=params, response_limit=None,
+                                  page_limit=page_limit, concurrency=concurrency)
+
+        return (int(i['date']['uts']) for i in iterator if i.get('date'))
+
+    def count_recent_tracks(self,
+                            username: str = None,
+                            from_time: datetime = None,
+                            to_time: datetime = None) -> int:
+        """Scrobble count over a time range read from the total of a single one item page"""
+        return self.recent_tracks_metadata(username=username, from_time=from_time, to_time=to_time).total
+
+    def recent_tracks_metadata(self,
+                               username: str = None,
+                               from_time: datetime = None,
+                               to_time: datetime = None,
+                               page_limit: int = 50) -> 'PageMetadata':
+        params = self.recent_tracks_params(username=username, from_time=from_time, to_time=to_time)
+        return PageCollection(net=self, method='user.getrecenttracks', params=params,
+                              page_limit=page_limit).metadata()
+
     def count_scrobbles_from_date(self,
                                   input_date: date,
                                   username: str = None,
                                   limit: int = None) -> int:
         logger.info(f'getting {input_date} scrobble count for {username or self.username}')
 
+        if limit is None:
+            from_date, to_date = self.day_range(input_date)
+            return self.count_recent_tracks(username=username, from_time=from_date, to_time=to_date)
+
         scrobbles = self.scrobbles_from_date(input_date=input_date, username=username, limit=limit)
 
         if scrobbles:
@@ -219,9 +491,10 @@ class Network:
             logging.error(f'abnormal response - {resp}')
 
     def top_tracks(self,
-                   period: Range,
+                   period: BaseNetwork.Range,
                    username: str = None,
-                   limit: int = None):
+                   limit: int = None,
+                   concurrency: int = 1):
         if limit is not None:
             logger.info(f'pulling top {limit} tracks from {period.value} for {username or self.username}')
         else:
@@ -232,15 +505,17 @@ class Network:
             'period': period.value
         }
 
-        iterator = PageCollection(net=self, method='user.gettoptracks', params=params, response_limit=limit)
+        iterator = PageCollection(net=self, method='user.gettoptracks', params=params, response_limit=limit,
+                                  concurrency=concurrency)
         iterator.load()
 
         return [self.parse_track(i) for i in iterator.items]
 
     def top_albums(self,
-                   period: Range,
+                   period: BaseNetwork.Range,
                    username: str = None,
-                   limit: int = None):
+                   limit: int = None,
+                   concurrency: int = 1):
         if limit is not None:
             logger.info(f'pulling top {limit} albums from {period.value} for {username or self.username}')
         else:
@@ -251,15 +526,17 @@ class Network:
             'period': period.value
         }
 
-        iterator = PageCollection(net=self, method='user.gettopalbums', params=params, response_limit=limit)
+        iterator = PageCollection(net=self, method='user.gettopalbums', params=params, response_limit=limit,
+                                  concurrency=concurrency)
         iterator.load()
 
         return [self.parse_chart_album(i) for i in iterator.items]
 
     def top_artists(self,
-                    period: Range,
+                    period: BaseNetwork.Range,
                     username: str = None,
-                    limit: int = None):
+                    limit: int = None,
+                    concurrency: int = 1):
         if limit is not None:
             logger.info(f'pulling top {limit} artists from {period.value} for {username or self.username}')
         else:
@@ -270,18 +547,44 @@ class Network:
             'period': period.value
         }
 
-        iterator = PageCollection(net=self, method='user.gettopartists', params=params, response_limit=limit)
+        iterator = PageCollection(net=self, method='user.gettopartists', params=params, response_limit=limit,
+                                  concurrency=concurrency)
         iterator.load()
 
         return [self.parse_artist(i) for i in iterator.items]
 
+    def top_metadata(self,
+                     object_type: str,
+                     period: BaseNetwork.Range,
+                     username: str = None,
+                     page_limit: int = 50) -> 'PageMetadata':
+        """Size of a top chart from one single item request"""
+        if object_type not in ['album', 'artist', 'track']:
+            raise ValueError('invalid object type')
+
+        params = {
+            'user': username or self.username,
+            'period': period.value
+        }
+
+        return PageCollection(net=self, method=f'user.gettop{object_type}s', params=params,
+                              page_limit=page_limit).metadata()
+
+    def count_top_tracks(self, period: BaseNetwork.Range, username: str = None) -> int:
+        return self.top_metadata('track', period=period, username=username).total
+
+    def count_top_albums(self, period: BaseNetwork.Range, username: str = None) -> int:
+        return self.top_metadata('album', period=period, username=username).total
+
+    def count_top_artists(self, period: BaseNetwork.Range, username: str = None) -> int:
+        return self.top_metadata('artist', period=period, username=username).total
+
     def weekly_charts(self, username: str = None):
         logger.info('getting weekly chart list')
 
         resp = self.get_request('user.getweeklychartlist', user=username or self.username)
         if resp:
-            return [WeeklyChart(from_time=int(i['from']), to_time=int(i['to']))
-                    for i in resp.get('weeklychartlist', {}).get('chart', [])]
+            return self.parse_weekly_charts(resp)
         else:
             logger.error('no response')
 
@@ -293,132 +596,16 @@ class Network:
                      username: str = None,
                      limit: int = None):
 
-        if object_type not in ['album', 'artist', 'track']:
-            raise ValueError('invalid object type')
-
-        if chart is None and (from_time is None or to_time is None):
-            raise ValueError('no time range')
-
-        if chart is not None:
-            from_time = chart.from_secs
-            to_time = chart.to_secs
-
-        if limit is not None:
-            logger.info(f'pulling top {limit} {object_type}s from {chart.from_date} to {chart.to_date} '
-                        f'for {username or self.username}')
-        else:
-            logger.info(f'pulling top {object_type}s from {chart.from_date} to {chart.to_date} '
-                        f'for {username or self.username}')
-
-        params = {
-            'user': username or self.username,
-            'from': from_time,
-            'to': to_time
-        }
+        params = self.weekly_chart_params(object_type=object_type, chart=chart, from_time=from_time,
+                                          to_time=to_time, username=username, limit=limit)
 
         resp = self.get_request(method=f'user.getweekly{object_type}chart', params=params)
 
         if resp:
-            if object_type == 'track':
-                return [self.parse_track(i) for i in resp.get('weeklytrackchart', {}).get('track', [])]
-            elif object_type == 'album':
-                return [self.parse_album(i) for i in resp.get('weeklyalbumchart', {}).get('album', [])]
-            elif object_type == 'artist':
-                return [self.parse_artist(i) for i in resp.get('weeklyartistchart', {}).get('artist', [])]
+            return self.parse_weekly_chart(object_type, resp)
         else:
             logger.error('no response')
 
-    @staticmethod
-    def parse_wiki(wiki_dict) -> Optional[Wiki]:
-        if wiki_dict:
-            return Wiki(published=datetime.strptime(wiki_dict.get('published', None), '%d %b %Y, %H:%M'),
-                        summary=wiki_dict.get('summary', None),
-                        content=wiki_dict.get('content', None))
-        else:
-            return None
-
-    def parse_artist(self, artist_dict) -> Artist:
-        return Artist(name=artist_dict.get('name', 'n/a'),
-                      url=artist_dict.get('url', None),
-                      mbid=artist_dict.get('mbid', None),
-                      listeners=int(artist_dict.get('stats', {}).get('listeners', 0)),
-                      play_count=int(artist_dict.get('stats', {}).get('playcount', 0)),
-                      user_scrobbles=int(artist_dict.get('stats', {}).get('userplaycount',
-                                                                          artist_dict.get('playcount', 0))),
-                      wiki=self.parse_wiki(artist_dict['wiki']) if artist_dict.get('wiki', None) else None,
-                      images=[self.parse_image(i) for i in artist_dict.get('image', [])])
-
-    def parse_album(self, album_dict) -> Album:
-        return Album(name=album_dict.get('name', album_dict.get('title', 'n/a')),
-                     url=album_dict.get('url', 'n/a'),
-                     mbid=album_dict.get('mbid', 'n/a'),
-                     listeners=int(album_dict.get('listeners', 0)),
-                     play_count=int(album_dict.get('playcount', 0)),
-                     user_scrobbles=int(album_dict.get('userplaycount', 0) if album_dict.get('userplaycount', 0) is not dict else 0),
-                     wiki=self.parse_wiki(album_dict['wiki']) if album_dict.get('wiki', None) else None,
-                     artist=album_dict.get('artist'),
-                     images=[self.parse_image(i) for i in album_dict.get('image', [])])
-
-    def parse_chart_album(self, album_dict) -> Album:
-        return Album(name=album_dict.get('name', album_dict.get('title', 'n/a')),
-                     url=album_dict.get('url', 'n/a'),
-                     mbid=album_dict.get('mbid', 'n/a'),
-                     listeners=int(album_dict.get('listeners', 0)),
-                     user_scrobbles=int(album_dict.get('playcount', 0)),
-                     wiki=self.parse_wiki(album_dict['wiki']) if album_dict.get('wiki', None) else None,
-                     artist=album_dict.get('artist'),
-                     images=[self.parse_image(i) for i in album_dict.get('image', [])])
-
-    def parse_track(self, track_dict) -> Track:
-        track = Track(name=track_dict.get('name', 'n/a'),
-                      url=track_dict.get('url', 'n/a'),
-                      mbid=track_dict.get('mbid', 'n/a'),
-                      listeners=int(track_dict.get('listeners', 0)),
-                      play_count=int(track_dict.get('playcount', 0)),
-                      duration=int(track_dict['duration']) if track_dict.get('duration') else None,
-                      user_scrobbles=int(track_dict.get('userplaycount', 0)),
-                      wiki=self.parse_wiki(track_dict['wiki']) if track_dict.get('wiki', None) else None,
-                      images=[self.parse_image(i) for i in track_dict.get('image', [])])
-
-        if track_dict.get('album', None):
-            track.album = self.parse_album(track_dict['album'])
-
-        if track_dict.get('artist', None):
-            track.artist = self.parse_artist(track_dict['artist'])
-
-        return track
-
-    @staticmethod
-    def parse_image(image_dict) -> Image:
-        try:
-            return Image(size=Image.Size[image_dict['size']], link=image_dict['#text'])
-        except KeyError:
-            return Image(size=Image.Size['other'], link=image_dict['#text'])
-
-    @staticmethod
-    def parse_scrobble(scrobble_dict) -> Scrobble:
-        album = None
-        if scrobble_dict.get('album', None):
-            album = Album(name=scrobble_dict['album'].get('#text', 'n/a'),
-                          mbid=scrobble_dict['album'].get('mbid', None))
-
-        artist = None
-        if scrobble_dict.get('artist', None):
-            artist = Artist(name=scrobble_dict['artist'].get('#text', 'n/a'),
-                            mbid=scrobble_dict['artist'].get('mbid', None))
-
-        if artist is not None and album is not None:
-            if album.artist is None:
-                album.artist = artist
-
-        track = Track(name=scrobble_dict.get('name', 'n/a'),
-                      album=album,
-                      artist=artist,
-                      mbid=scrobble_dict.get('mbid', None),
-                      url=scrobble_dict.get('url', None))
-
-        return Scrobble(track=track, time=datetime.fromtimestamp(int(scrobble_dict['date']['uts'])))
-
 
 class PageCollection:
     def __init__(self,
@@ -426,13 +613,15 @@ class PageCollection:
                  method: str,
                  params: dict = None,
                  page_limit: int = 50,
-                 response_limit: int = 50):
+                 response_limit: int = 50,
+                 concurrency: int = 1):
         self.net = net
         self.method = method
         self.params = params
         self.pages: List[Page] = []
         self.page_limit = min(page_limit, 200)
         self.response_limit = response_limit
+        self.concurrency = max(concurrency, 1)
         self.counter = 0
 
     def __len__(self):
@@ -454,44 +643,112 @@ class PageCollection:
             items += page.items
         return items[:self.response_limit]
 
+    def __iter__(self):
+        """Lazily yield raw items page by page, pages are dropped once consumed"""
+        count = 0
+        for page in self.iter_pages():
+            for item in page.items:
+                if self.response_limit and count >= self.response_limit:
+                    return
+                count += 1
+                yield item
+
     def load(self):
+        for page in self.iter_pages():
+            self.pages.append(page)
+
+    def iter_pages(self):
+        """Yield pages in page order without retaining them.
+
+        The first page is loaded to find the page count, with concurrency above one the remainder are pulled
+        through a bounded worker pool holding at most that many pages in flight. Iteration stops once the
+        response limit is satisfied"""
+
+        first_page = self.iterate()
+        if first_page is None or len(first_page) == 0:
+            return
+
+        loaded = len(first_page)
+        last_page = first_page.total_pages
+        yield first_page
+        # only the pages in flight should stay referenced
+        del first_page
+
         if self.response_limit:
-            tracker = True
-            while len(self) < self.response_limit and tracker:
-                page = self.iterate()
-                if len(page) == 0 or self.counter > page.total_pages:
-                    tracker = False
-                else:
-                    self.pages.append(page)
-        else:
-            tracker = True
-            while tracker:
+            last_page = min(last_page, ceil(self.response_limit / self.page_limit))
+
+        if self.concurrency == 1:
+            while self.counter < last_page and not (self.response_limit and loaded >= self.response_limit):
                 page = self.iterate()
-                if len(page) == 0 or self.counter > page.total_pages:
-                    tracker = False
-                else:
-                    self.pages.append(page)
+                if page is None or len(page) == 0:
+                    return
+
+                loaded += len(page)
+                yield page
+            return
+
+        if last_page <= 1 or (self.response_limit and loaded >= self.response_limit):
+            return
+
+        logger.debug(f'loading pages 2-{last_page} of {self.method} with {self.concurrency} workers')
+
+        pending = deque()
+        next_number = 2
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while next_number <= last_page and len(pending) < self.concurrency:
+                    pending.append(executor.submit(self.get_page, next_number))
+                    next_number += 1
+
+                while pending:
+                    page = pending.popleft().result()
+                    if page is None or len(page) == 0:
+                        return
+
+                    self.counter = page.number
+                    loaded += len(page)
+                    yield page
+
+                    if self.response_limit and loaded >= self.response_limit:
+                        return
+
+                    if next_number <= last_page:
+                        pending.append(executor.submit(self.get_page, next_number))
+                        next_number += 1
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def metadata(self) -> 'PageMetadata':
+        """Total items and pages at page_limit from a single one item request, no items are kept"""
+        page = self.get_page(1, limit=1)
+        if page is None:
+            return PageMetadata(total=0, total_pages=0, page_limit=self.page_limit)
+
+        return PageMetadata(total=page.total,
+                            total_pages=ceil(page.total / self.page_limit),
+                            page_limit=self.page_limit)
+
+    def count(self) -> int:
+        return self.metadata().total
 
     def iterate(self):
-        logger.debug(f'iterating {self.method}')
         self.counter += 1
+        return self.get_page(self.counter)
+
+    def get_page(self, number: int, limit: int = None):
+        logger.debug(f'iterating {self.method} page {number}')
 
         params = deepcopy(self.params)
 
         params.update({
-            'limit': self.page_limit,
-            'page': self.counter
+            'limit': limit or self.page_limit,
+            'page': number
         })
         resp = self.net.get_request(method=self.method, params=params)
 
         if resp:
             return self.parse_page(resp)
-            # if len(page) > 0:
-            #     if self.response_limit:
-            #         if len(self) < self.response_limit:
-            #             self.iterate()
-            #     else:
-            #         self.iterate()
         else:
             logger.error('no response')
 
@@ -526,3 +783,10 @@ class Page:
 
     def __len__(self):
         return len(self.items)
+
+
+@dataclass
+class PageMetadata:
+    total: int
+    total_pages: int
+    page_limit: int
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic, sleep
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimiterStats:
+    requests: int = 0
+    delayed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        if self.requests == 0:
+            return 0.0
+        return self.total_wait / self.requests
+
+    def __str__(self):
+        return f'{self.requests} requests, {self.delayed} delayed, ' \
+               f'{self.total_wait:.2f}s total wait, {self.max_wait:.2f}s max wait'
+
+
+class RateLimiter:
+    """Paces requests before they are sent, the base limiter never waits.
+
+    Subclasses implement reserve() which claims a slot and returns how long the caller must wait before using
+    it, this keeps the limiter usable from threads and from an event loop alike"""
+
+    def __init__(self):
+        self.stats = RateLimiterStats()
+        self._stats_lock = Lock()
+
+    def reserve(self) -> float:
+        self._record(0.0)
+        return 0.0
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = RateLimiterStats()
+
+    def _record(self, wait: float):
+        with self._stats_lock:
+            self.stats.requests += 1
+            if wait > 0:
+                self.stats.delayed += 1
+                self.stats.total_wait += wait
+                self.stats.max_wait = max(self.stats.max_wait, wait)
+
+
+class TokenBucket(RateLimiter):
+    """Token bucket allowing bursts of up to burst requests and a sustained rate of rate requests per second.
+
+    Tokens may go negative, each reservation made while the bucket is empty queues behind the ones before it"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        super().__init__()
+
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._last = monotonic()
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            logger.debug(f'rate limited, waiting {wait:.3f}s')
+        self._record(wait)
+        return wait
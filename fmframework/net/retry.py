@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import random
+from typing import Optional, Tuple
+
+
+@dataclass
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+
+    Delays grow exponentially from base_delay up to max_delay, jitter is the fraction of each delay that is
+    randomised so concurrent callers spread out instead of retrying in lockstep. A Retry-After header from the
+    server takes precedence over the computed delay but is still capped at max_delay"""
+
+    max_retries: int = 5
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    error_codes: Tuple[int, ...] = (8, 11, 16, 29)
+    status_codes: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    retry_connection_errors: bool = True
+
+    def can_retry(self, attempt: int) -> bool:
+        """Whether another try is allowed after the given number of attempts"""
+        return attempt <= self.max_retries
+
+    def should_retry(self, status_code: int = None, error_code: int = None) -> bool:
+        return status_code in self.status_codes or error_code in self.error_codes
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        backoff = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return backoff * (1 - self.jitter * random())
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given either as delay seconds or as an HTTP date"""
+        if not value:
+            return None
+
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+
+        try:
+            retry_time = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if retry_time.tzinfo is None:
+            retry_time = retry_time.replace(tzinfo=timezone.utc)
+        return max((retry_time - datetime.now(timezone.utc)).total_seconds(), 0.0)
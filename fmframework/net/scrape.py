@@ -1,20 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from datetime import date, datetime, timedelta
-from typing import Union
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Iterable, List, Union
 
-from bs4 import BeautifulSoup
 from requests import Session
+from requests.adapters import HTTPAdapter
 from urllib import parse
 
 from fmframework.model import Track, Artist, Album, Scrobble
+from fmframework.net.fixtures import FixtureStore
+from fmframework.net.html import ChartRow, ParserBackend, get_backend
 from fmframework.net.network import Network, LastFMNetworkException
+from fmframework.net.ratelimit import RateLimiter
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ScrapeExecutor:
+    """Pooled session and worker threads shared by the scrapers.
+
+    Requests to any one host are capped at host_concurrency however many threads are issuing them, map() fans
+    page fetches out over the pool and returns results in input order. Jobs which themselves fan out pages go
+    through map_jobs() on a separate pool so they never wait on workers they are occupying.
+
+    With a fixture store in record mode every fetched page is also written to disk, in replay mode pages are
+    served from the store and nothing goes to the network"""
+
+    MODES = ('live', 'record', 'replay')
+
+    def __init__(self,
+                 max_workers: int = 8,
+                 host_concurrency: int = 4,
+                 job_workers: int = 4,
+                 rate_limiter: RateLimiter = None,
+                 fixtures: FixtureStore = None,
+                 mode: str = 'live'):
+        if mode not in self.MODES:
+            raise ValueError(f'mode {mode} not one of {self.MODES}')
+        if mode != 'live' and fixtures is None:
+            raise ValueError(f'{mode} mode requires a fixture store')
+
+        self.max_workers = max_workers
+        self.host_concurrency = host_concurrency
+        self.job_workers = job_workers
+        self.rate_limiter = rate_limiter
+        self.fixtures = fixtures
+        self.mode = mode
+
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, host_concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._pool = None
+        self._job_pool = None
+        self._host_semaphores = {}
+        self._lock = Lock()
+
+    @classmethod
+    def recording(cls, directory: str, **kwargs):
+        return cls(fixtures=FixtureStore(directory), mode='record', **kwargs)
+
+    @classmethod
+    def replaying(cls, directory: str, **kwargs):
+        return cls(fixtures=FixtureStore(directory), mode='replay', **kwargs)
+
+    def get(self, url: str, headers: dict = None):
+        if self.mode == 'replay':
+            return self.fixtures.replay(url)
+
+        with self._host_semaphore(parse.urlsplit(url).netloc):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            response = self.session.get(url, headers=headers)
+
+        if self.mode == 'record':
+            self.fixtures.record(url, response)
+
+        return response
+
+    def map(self, fn: Callable, iterable: Iterable) -> List:
+        items = list(iterable)
+        if len(items) == 0:
+            return []
+        if len(items) == 1 or self.max_workers <= 1:
+            return [fn(i) for i in items]
+
+        return list(self.pool.map(fn, items))
+
+    def map_jobs(self, fn: Callable, iterable: Iterable) -> List:
+        items = list(iterable)
+        if len(items) == 0:
+            return []
+        if len(items) == 1 or self.job_workers <= 1:
+            return [fn(i) for i in items]
+
+        return list(self.job_pool.map(fn, items))
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fmscrape')
+            return self._pool
+
+    @property
+    def job_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._job_pool is None:
+                self._job_pool = ThreadPoolExecutor(max_workers=self.job_workers, thread_name_prefix='fmscrapejob')
+            return self._job_pool
+
+    def shutdown(self):
+        with self._lock:
+            for pool in (self._job_pool, self._pool):
+                if pool is not None:
+                    pool.shutdown()
+            self._pool = None
+            self._job_pool = None
+
+    def _host_semaphore(self, host: str) -> BoundedSemaphore:
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._host_semaphores[host] = BoundedSemaphore(self.host_concurrency)
+            return semaphore
+
+
+default_executor = ScrapeExecutor()
+default_parser = get_backend()
+
+
 class LibraryScraper:
-    rsession = Session()
+    executor: ScrapeExecutor = default_executor
+    parser: ParserBackend = default_parser
 
     @staticmethod
     def api_date_range_to_url_string(period: Network.Range):
@@ -43,17 +165,14 @@ class LibraryScraper:
                                                       whole_track=False, from_date=from_date, to_date=to_date,
                                                       date_preset=date_preset)
 
-        scrobbles = []
-        for track in artists_tracks:
-            tracks_scrobbles = LibraryScraper.track_scrobbles(username=username, artist=artist, track=track.name,
-                                                              net=net, whole_track=whole_track,
-                                                              from_date=from_date, to_date=to_date,
-                                                              date_preset=date_preset)
+        if artists_tracks is None:
+            logger.error(f'no tracks returned for {artist} / {username}')
+            return
 
-            if tracks_scrobbles is not None:
-                scrobbles += tracks_scrobbles
-            else:
-                logger.warning(f'no scrobbles returned for {track.name} / {track.artist.name} / {username}')
+        scrobbles = LibraryScraper.tracks_scrobbles(username=username, artist=artist, tracks=artists_tracks,
+                                                    net=net, whole_track=whole_track,
+                                                    from_date=from_date, to_date=to_date,
+                                                    date_preset=date_preset)
 
         return sorted(scrobbles, key=lambda x: x.time, reverse=reverse)
 
@@ -88,37 +207,12 @@ class LibraryScraper:
                               date_preset: str = None):
         logger.info(f'loading page scraped {artist} tracks for {username}')
 
-        page1 = LibraryScraper.scraped_artist_subpage(username=username, artist=artist, page=1,
-                                                      url_key='tracks', include_pages=True,
-                                                      from_date=from_date, to_date=to_date,
-                                                      date_preset=date_preset)
-
-        if page1 is not None:
-            tracks = page1[0]
-            for page_number in range(page1[1] - 1):
-
-                page = LibraryScraper.scraped_artist_subpage(username=username, artist=artist,
-                                                             url_key='tracks',
-                                                             page=page_number + 2,
-                                                             from_date=from_date, to_date=to_date,
-                                                             date_preset=date_preset)
-
-                if page is not None:
-                    tracks += page
-                else:
-                    logger.error(f'no tracks returned for {artist} / {username}')
-
-            track_objects = []
-            for album in tracks:
-                name_cell = album.find('td', class_='chartlist-name').find('a')
-                count_cell = album.find(class_='chartlist-count-bar-value')
-
-                track_objects.append(Track(name=name_cell.string,
-                                           artist=Artist(name=artist),
-                                           url=name_cell['href'],
-                                           user_scrobbles=int(count_cell.contents[0].strip())))
+        tracks = LibraryScraper.scraped_artist_subpages(username=username, artist=artist, url_key='tracks',
+                                                        from_date=from_date, to_date=to_date,
+                                                        date_preset=date_preset)
 
-            return track_objects
+        if tracks is not None:
+            return [LibraryScraper.row_to_track(row, artist=artist) for row in tracks]
         else:
             logger.error(f'no tracks returned for page 1 of {artist} / {username}')
 
@@ -153,38 +247,12 @@ class LibraryScraper:
                                date_preset: str = None):
         logger.info(f'loading page scraped {artist} albums for {username}')
 
-        page1 = LibraryScraper.scraped_artist_subpage(username=username, artist=artist, page=1,
-                                                      url_key='albums',
-                                                      include_pages=True,
-                                                      from_date=from_date, to_date=to_date,
-                                                      date_preset=date_preset)
-
-        if page1 is not None:
-            albums = page1[0]
-            for page_number in range(page1[1] - 1):
-
-                page = LibraryScraper.scraped_artist_subpage(username=username, artist=artist,
-                                                             url_key='albums',
-                                                             page=page_number + 2,
-                                                             from_date=from_date, to_date=to_date,
-                                                             date_preset=date_preset)
-
-                if page is not None:
-                    albums += page
-                else:
-                    logger.error(f'no albums returned for {artist} / {username}')
-
-            albums_objects = []
-            for album in albums:
-                name_cell = album.find('td', class_='chartlist-name').find('a')
-                count_cell = album.find(class_='chartlist-count-bar-value')
-
-                albums_objects.append(Album(name=name_cell.string,
-                                            artist=Artist(name=artist),
-                                            user_scrobbles=int(count_cell.contents[0].strip()),
-                                            url=name_cell['href']))
+        albums = LibraryScraper.scraped_artist_subpages(username=username, artist=artist, url_key='albums',
+                                                        from_date=from_date, to_date=to_date,
+                                                        date_preset=date_preset)
 
-            return albums_objects
+        if albums is not None:
+            return [LibraryScraper.row_to_album(row, artist=artist) for row in albums]
         else:
             logger.error(f'no albums returned for page 1 of {artist} / {username}')
 
@@ -202,19 +270,83 @@ class LibraryScraper:
             logger.error(f'no tracks returned for {album} / {artist} / {username}')
             return
 
-        scrobbles = []
-        for track in albums_tracks:
-            tracks_scrobbles = LibraryScraper.track_scrobbles(username=username, artist=artist, track=track.name,
-                                                              net=net, whole_track=whole_track,
-                                                              from_date=from_date, to_date=to_date,
-                                                              date_preset=date_preset)
+        scrobbles = LibraryScraper.tracks_scrobbles(username=username, artist=artist, tracks=albums_tracks,
+                                                    net=net, whole_track=whole_track,
+                                                    from_date=from_date, to_date=to_date,
+                                                    date_preset=date_preset)
+
+        return sorted(scrobbles, key=lambda x: x.time, reverse=reverse)
 
+    @staticmethod
+    def tracks_scrobbles(username: str, artist: str, tracks: List[Track], net: Network = None, whole_track=True,
+                         from_date: datetime = None, to_date: datetime = None,
+                         date_preset: str = None):
+        """Scrape the scrobbles of each track as concurrent jobs then populate them with one API lookup per
+        distinct track and album across all of them"""
+
+        if whole_track and net is None:
+            raise NameError('Network required for populating tracks')
+
+        scraped = LibraryScraper.executor.map_jobs(
+            lambda track: LibraryScraper.track_scrobbles(username=username, artist=artist, track=track.name,
+                                                         net=net, whole_track=False,
+                                                         from_date=from_date, to_date=to_date,
+                                                         date_preset=date_preset),
+            tracks)
+
+        scrobbles = []
+        for track, tracks_scrobbles in zip(tracks, scraped):
             if tracks_scrobbles is not None:
                 scrobbles += tracks_scrobbles
             else:
                 logger.warning(f'no scrobbles returned for {track.name} / {track.artist.name} / {username}')
 
-        return sorted(scrobbles, key=lambda x: x.time, reverse=reverse)
+        if whole_track:
+            LibraryScraper.populate_scrobbles(scrobbles=scrobbles, net=net, username=username)
+
+        return scrobbles
+
+    @staticmethod
+    def populate_scrobbles(scrobbles: List[Scrobble], net: Network, username: str):
+        """Swap scraped tracks for full ones from the API in place.
+
+        Each distinct track and album is looked up once, concurrently, and scrobbles of the same track on the same
+        album share one populated track object"""
+
+        def track_key(scrobble):
+            return scrobble.track.name, scrobble.track.artist.name
+
+        def album_key(scrobble):
+            album = scrobble.track.album
+            if album is not None:
+                return album.name, album.artist.name
+
+        track_keys = list(dict.fromkeys(track_key(i) for i in scrobbles))
+        album_keys = list(dict.fromkeys(album_key(i) for i in scrobbles if album_key(i) is not None))
+        logger.info(f'populating {len(scrobbles)} scrobbles with {len(track_keys)} tracks '
+                    f'and {len(album_keys)} albums for {username}')
+
+        pulled_tracks = dict(zip(track_keys, LibraryScraper.executor.map_jobs(
+            lambda key: net.track(name=key[0], artist=key[1], username=username), track_keys)))
+        pulled_albums = dict(zip(album_keys, LibraryScraper.executor.map_jobs(
+            lambda key: net.album(name=key[0], artist=key[1], username=username), album_keys)))
+
+        populated = {}
+        for scrobble in scrobbles:
+            keys = (track_key(scrobble), album_key(scrobble))
+
+            track = populated.get(keys)
+            if track is None:
+                pulled_track = pulled_tracks.get(keys[0])
+                if pulled_track is None:
+                    logger.error(f'no track returned for {scrobble.track.name} / {scrobble.track.artist.name}')
+                    continue
+
+                track = copy(pulled_track)
+                track.album = pulled_albums.get(keys[1])
+                populated[keys] = track
+
+            scrobble.track = track
 
     @staticmethod
     def album_tracks(username: str, artist: str, album: str, net: Network = None, whole_track=True,
@@ -247,44 +379,15 @@ class LibraryScraper:
                              date_preset: str = None):
         logger.info(f'loading page scraped {artist} albums for {username}')
 
-        page1 = LibraryScraper.scraped_artist_subpage(username=username, artist=artist, page=1,
-                                                      album=album,
-                                                      include_pages=True,
-                                                      from_date=from_date, to_date=to_date,
-                                                      date_preset=date_preset)
-
-        if page1 is not None:
-            albums = page1[0]
-            for page_number in range(page1[1] - 1):
-
-                page = LibraryScraper.scraped_artist_subpage(username=username, artist=artist,
-                                                             album=album,
-                                                             page=page_number + 2,
-                                                             from_date=from_date, to_date=to_date,
-                                                             date_preset=date_preset)
-
-                if page is not None:
-                    albums += page
-                else:
-                    logger.error(f'no tracks returned for {album} / {artist} / {username}')
-
-            track_objects = []
-            for album in albums:
-                name_cell = album.find('td', class_='chartlist-name').find('a')
-                count_cell = album.find(class_='chartlist-count-bar-value')
-
-                artist_name = parse.unquote_plus(name_cell['href'].split('/')[2])
-
-                track_objects.append(Track(name=name_cell.string,
-                                           artist=Artist(name=artist_name),
-                                           url=name_cell['href'],
-                                           user_scrobbles=int(count_cell.contents[0].strip())))
+        albums = LibraryScraper.scraped_artist_subpages(username=username, artist=artist, album=album,
+                                                        from_date=from_date, to_date=to_date,
+                                                        date_preset=date_preset)
 
-            return track_objects
+        if albums is not None:
+            return [LibraryScraper.row_to_track(row) for row in albums]
         else:
             logger.error(f'no tracks returned for page 1 of {album} / {artist} / {username}')
 
-    # TODO cache pulled album to reduce requests
     @staticmethod
     def track_scrobbles(username: str, artist: str, track: str, net: Network = None, whole_track=True,
                         from_date: datetime = None, to_date: datetime = None,
@@ -298,23 +401,11 @@ class LibraryScraper:
         if whole_track and net is None:
             raise NameError('Network required for populating tracks')
 
-        populated_scrobbles = []
         if tracks is not None:
             if whole_track:
-                for scrobble in tracks:
-                    pulled_scrobble = net.track(name=scrobble.track.name,
-                                                artist=scrobble.track.artist.name,
-                                                username=username)
-                    pulled_scrobble.album = net.album(name=scrobble.track.album.name,
-                                                      artist=scrobble.track.album.artist.name,
-                                                      username=username)
-
-                    scrobble.track = pulled_scrobble
-                    populated_scrobbles.append(scrobble)
-
-                return populated_scrobbles
-            else:
-                return tracks
+                LibraryScraper.populate_scrobbles(scrobbles=tracks, net=net, username=username)
+
+            return tracks
         else:
             logger.error(f'no scraped tracks returned for {track} / {artist} / {username}')
 
@@ -324,57 +415,12 @@ class LibraryScraper:
                                 date_preset: str = None):
         logger.info(f'loading page scraped {track} / {artist} for {username}')
 
-        page1 = LibraryScraper.scraped_artist_subpage(username=username, artist=artist, page=1,
-                                                      track=track,
-                                                      include_pages=True,
-                                                      from_date=from_date, to_date=to_date,
-                                                      date_preset=date_preset)
+        albums = LibraryScraper.scraped_artist_subpages(username=username, artist=artist, track=track,
+                                                        from_date=from_date, to_date=to_date,
+                                                        date_preset=date_preset)
 
-        if page1 is not None:
-            albums = page1[0]
-            for page_number in range(page1[1] - 1):
-
-                page = LibraryScraper.scraped_artist_subpage(username=username, artist=artist,
-                                                             track=track,
-                                                             page=page_number + 2,
-                                                             from_date=from_date, to_date=to_date,
-                                                             date_preset=date_preset)
-
-                if page is not None:
-                    albums += page
-                else:
-                    logger.error(f'no scrobbles returned for {track} / {artist} / {username}')
-
-            track_objects = []
-            for album in albums:
-                name_cell = album.find('td', class_='chartlist-name').find('a')
-                album_cell = album.find('td', class_='chartlist-album').find('a')
-
-                album_artist_name = parse.unquote_plus(album_cell['href'].split('/')[2])
-                scrobble_timestamp = album.find('td', class_='chartlist-timestamp').find('span')
-
-                timestamp_parts = [i.strip() for i in scrobble_timestamp.string.split(', ')]
-
-                if len(timestamp_parts) == 1:
-                    try:
-                        scrobble_datetime = datetime.strptime(timestamp_parts[0], '%d %b %I:%M%p')  # this year
-                        scrobble_datetime = scrobble_datetime.replace(year=date.today().year)
-                    except ValueError:
-                        scrobble_datetime = datetime.now() - timedelta(hours=int(timestamp_parts[0][0]))  # X hours ago
-                elif len(timestamp_parts) == 2:
-                    recombined = ' '.join(timestamp_parts)
-                    scrobble_datetime = datetime.strptime(recombined, '%d %b %Y %I:%M%p')  # previous year
-                else:
-                    scrobble_datetime = None
-                    logger.error(f'{len(timestamp_parts)} timestamp parts found, {timestamp_parts}')
-
-                track_objects.append(Scrobble(track=Track(name=name_cell.string,
-                                                          artist=Artist(name=artist),
-                                                          album=Album(name=album_cell.string,
-                                                                      artist=Artist(name=album_artist_name)),
-                                                          url=name_cell['href']),
-                                              time=scrobble_datetime)
-                                     )
+        if albums is not None:
+            track_objects = [LibraryScraper.row_to_scrobble(row, artist=artist) for row in albums]
 
             length = len(track_objects)
             for scrobble in track_objects:
@@ -384,6 +430,96 @@ class LibraryScraper:
         else:
             logger.error(f'no scrobbles returned for page 1 of {track} / {artist} / {username}')
 
+    @staticmethod
+    def row_to_track(row: ChartRow, artist: str = None) -> Track:
+        """Track from an artist or album library row, the artist is read from the link when not given"""
+        if artist is None:
+            artist = parse.unquote_plus(row.url.split('/')[2])
+
+        return Track(name=row.name,
+                     artist=Artist(name=artist),
+                     url=row.url,
+                     user_scrobbles=LibraryScraper.parse_count(row.count))
+
+    @staticmethod
+    def row_to_album(row: ChartRow, artist: str) -> Album:
+        return Album(name=row.name,
+                     artist=Artist(name=artist),
+                     user_scrobbles=LibraryScraper.parse_count(row.count),
+                     url=row.url)
+
+    @staticmethod
+    def row_to_scrobble(row: ChartRow, artist: str) -> Scrobble:
+        album_artist_name = parse.unquote_plus(row.album_url.split('/')[2])
+
+        return Scrobble(track=Track(name=row.name,
+                                    artist=Artist(name=artist),
+                                    album=Album(name=row.album,
+                                                artist=Artist(name=album_artist_name)),
+                                    url=row.url),
+                        time=LibraryScraper.parse_timestamp(row.timestamp))
+
+    @staticmethod
+    def parse_count(count: str) -> int:
+        return int(count.strip().replace(',', ''))
+
+    @staticmethod
+    def parse_timestamp(timestamp: str):
+        timestamp_parts = [i.strip() for i in timestamp.split(', ')]
+
+        if len(timestamp_parts) == 1:
+            try:
+                scrobble_datetime = datetime.strptime(timestamp_parts[0], '%d %b %I:%M%p')  # this year
+                scrobble_datetime = scrobble_datetime.replace(year=date.today().year)
+            except ValueError:
+                scrobble_datetime = datetime.now() - timedelta(hours=int(timestamp_parts[0][0]))  # X hours ago
+        elif len(timestamp_parts) == 2:
+            recombined = ' '.join(timestamp_parts)
+            scrobble_datetime = datetime.strptime(recombined, '%d %b %Y %I:%M%p')  # previous year
+        else:
+            scrobble_datetime = None
+            logger.error(f'{len(timestamp_parts)} timestamp parts found, {timestamp_parts}')
+
+        return scrobble_datetime
+
+    @staticmethod
+    def scraped_artist_subpages(username: str, artist: str,
+                                url_key: str = None,
+                                album: str = None,
+                                track: str = None,
+                                from_date: datetime = None, to_date: datetime = None,
+                                date_preset: Union[str, Network.Range] = None):
+        """Scrape rows from every page of a library subpage, pages after the first are fetched concurrently
+        through the executor and merged in page order"""
+
+        page1 = LibraryScraper.scraped_artist_subpage(username=username, artist=artist, page=1,
+                                                      url_key=url_key, album=album, track=track,
+                                                      include_pages=True,
+                                                      from_date=from_date, to_date=to_date,
+                                                      date_preset=date_preset)
+
+        if page1 is None:
+            return None
+
+        rows, page_count = page1
+        page_numbers = range(2, page_count + 1)
+
+        pages = LibraryScraper.executor.map(
+            lambda page_number: LibraryScraper.scraped_artist_subpage(username=username, artist=artist,
+                                                                      page=page_number,
+                                                                      url_key=url_key, album=album, track=track,
+                                                                      from_date=from_date, to_date=to_date,
+                                                                      date_preset=date_preset),
+            page_numbers)
+
+        for page_number, page in zip(page_numbers, pages):
+            if page is not None:
+                rows += page
+            else:
+                logger.error(f'no rows returned for page {page_number} of {artist} / {username}')
+
+        return rows
+
     @staticmethod
     def scraped_artist_subpage(username: str, artist: str, page: int,
 
@@ -433,24 +569,23 @@ class LibraryScraper:
             "Upgrade-Insecure-Requests": "1",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:75.0) Gecko/20100101 Firefox/75.0",
         }
-        html = LibraryScraper.rsession.get(url, headers=headers)
+        html = LibraryScraper.executor.get(url, headers=headers)
 
         if 200 <= html.status_code < 300:
-            parser = BeautifulSoup(html.content, 'html.parser')
-
-            objs = [i for i in parser.find_all('tr') if i.find('td', class_='chartlist-name')]
+            rows, page_count = LibraryScraper.parser.parse(html.content)
 
             if include_pages:
-                return objs, len(parser.find_all('li', class_='pagination-page'))
+                return rows, page_count
             else:
-                return objs
+                return rows
 
         else:
             logger.error(f'HTTP error occurred {html.status_code}')
 
 
 class UserScraper:
-    rsession = Session()
+    executor: ScrapeExecutor = default_executor
+    parser: ParserBackend = default_parser
 
     @staticmethod
     def album_chart(net: Network, username: str, from_date: date, to_date: date, limit: int):
@@ -479,8 +614,9 @@ class UserScraper:
             pages += 1
 
         albums = []
-        for i in range(pages):
-            scraped_albums = UserScraper.scraped_album_chart_page(username, from_date, to_date, i + 1)
+        for scraped_albums in UserScraper.executor.map(
+                lambda page: UserScraper.scraped_album_chart_page(username, from_date, to_date, page),
+                range(1, pages + 1)):
             if scraped_albums is not None:
                 albums += scraped_albums
 
@@ -501,35 +637,28 @@ class UserScraper:
             "Upgrade-Insecure-Requests": "1",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:75.0) Gecko/20100101 Firefox/75.0",
         }
-        html = UserScraper.rsession.get(f'https://www.last.fm/user/{username}/library/albums'
+        html = UserScraper.executor.get(f'https://www.last.fm/user/{username}/library/albums'
                                         f'?from={from_date.strftime("%Y-%m-%d")}'
                                         f'&to={to_date.strftime("%Y-%m-%d")}'
                                         f'&page={page}',
                                         headers=headers)
         if 200 <= html.status_code < 300:
-            parser = BeautifulSoup(html.content, 'html.parser')
-            rows = parser.find_all('tr', 'chartlist-row')
-
-            albums = []
-            for row in rows:
-                names = row.find_all('a', title=True)
-                album_name = names[0]['title']
-                artist_name = names[1]['title']
-
-                scrobble_tag = row.find('span', {"class": "chartlist-count-bar-value"})
-                scrobble_count = [int(s) for s in scrobble_tag.contents[0].split() if s.isdigit()]
-
-                if len(scrobble_count) != 1:
-                    logger.error('no scrobble count integers found')
-                    scrobble_count = 0
-                else:
-                    scrobble_count = scrobble_count[0]
-
-                album = Album(name=album_name,
-                              artist=Artist(name=artist_name),
-                              user_scrobbles=scrobble_count)
-                albums.append(album)
-
-            return albums
+            rows, _ = UserScraper.parser.parse(html.content)
+
+            return [UserScraper.row_to_album(row) for row in rows]
         else:
             logger.error(f'HTTP error occurred {html.status_code}')
+
+    @staticmethod
+    def row_to_album(row: ChartRow) -> Album:
+        scrobble_count = [int(s) for s in row.count.replace(',', '').split() if s.isdigit()]
+
+        if len(scrobble_count) != 1:
+            logger.error('no scrobble count integers found')
+            scrobble_count = 0
+        else:
+            scrobble_count = scrobble_count[0]
+
+        return Album(name=row.titles[0],
+                     artist=Artist(name=row.titles[1]),
+                     user_scrobbles=scrobble_count)